@@ -1,42 +1,763 @@
 #!/usr/bin/env python3
 #
+# Merge overlapping/adjacent CIDR blocks, one per line on stdin.
+#
 # Example 1: All blocks in list.txt, one CIDR per line
-#   cat list.txt | cidr.py
+#   cat list.txt | cidr-merge.py
 #
 # Example 2: Echo CIDR blocks to stdout
-#   echo 1.2.3.0/25 1.2.3.128/25 | cidr.py
+#   printf '1.2.3.0/25\n1.2.3.128/25\n' | cidr-merge.py
+#
+# Example 3: Parse a large file on every core
+#   cidr-merge.py blocklist.txt > merged.txt
+#
+# Example 4: A blocklist without our own ranges, and what changed since last time
+#   cidr-merge.py --subtract own.txt blocklist.txt
+#   cidr-merge.py --diff old.txt new.txt    # "+" added, "-" removed
+#
+# Example 5: Build a lookup index once, then filter log lines by client IP
+#   cidr-merge.py --write-index blocked.idx blocklist.txt
+#   cidr-merge.py --lookup blocked.idx access.log
+#
+# Example 6: At most 20000 prefixes per family for an nftables set, none wider than /16
+#   cidr-merge.py --max-prefixes 20000 --min-prefixlen 16 blocklist.txt
+#
+# Input is streamed: every block becomes an integer (start, end) range, and
+# once --buffer ranges of an address family are held they are sorted,
+# coalesced and spilled to a temporary run file. The runs are then merged
+# in one pass, so memory stays bounded however long the input is.
+#
+# Addresses are parsed with socket.inet_pton and kept as packed integers
+# (IPv4 ranges as start << 32 | end in an array('Q')), so no per-line
+# objects are created. NumPy, when installed, sorts and coalesces IPv4
+# buffers in bulk. netaddr is optional: it is only tried for lines the
+# standard library cannot parse.
+#
+# Files given as arguments are memory-mapped and, when large, split at line
+# boundaries into chunks that worker processes (--jobs) parse into sorted
+# runs; the runs then go through the same k-way merge.
+#
+# --max-prefixes trades exactness for fewer rules: neighbouring blocks are
+# replaced by their smallest common supernet, the ones adding the fewest
+# addresses first, until each family fits. This needs the exact blocks of a
+# family in memory, and the extra coverage is reported on stderr.
+#
+# Index file layout (--write-index / --lookup), all counts in native byte
+# order as flagged by the magic:
+#   magic "CIDRIDX" + "L"/"B", IPv4 range count, IPv6 range count (uint64)
+#   IPv4 starts, IPv4 ends     native uint32 each
+#   IPv6 starts, IPv6 ends     16-byte big-endian each
+# Starts are sorted and ranges are disjoint, so membership is one binary
+# search over the memory-mapped starts.
 
+import argparse
+import bisect
+import heapq
+import ipaddress
+import mmap
+import os
+import socket
+import stat
+import struct
 import sys
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 try:
-    from netaddr import IPNetwork, cidr_merge, AddrFormatError
+    from netaddr import IPNetwork, AddrFormatError
 except ImportError:
+    IPNetwork = None
+
+# Ranges of one address family held in memory before a run is spilled.
+DEFAULT_BUFFER = 250_000
+ADDRESS_BITS = {4: 32, 6: 128}
+ADDRESS_FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+# Spilled runs are read back this many records at a time.
+READ_RECORDS = 4096
+# Files smaller than this are parsed in-process; larger ones are split into
+# chunks of about a quarter of size / jobs, within the chunk size bounds.
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024
+CHUNK_SIZE_MIN = 1024 * 1024
+CHUNK_SIZE_MAX = 32 * 1024 * 1024
+INDEX_MAGIC = b"CIDRIDX" + (b"L" if sys.byteorder == "little" else b"B")
+INDEX_HEADER = struct.Struct("=8sQQ")
+# Query lines looked up together when NumPy is available.
+LOOKUP_BATCH = 65536
+
+
+def parse_network(line):
+    """Return (version, start, end) for a CIDR block or address, or None if invalid."""
+    address, slash, prefix = line.partition("/")
+    version = 6 if ":" in address else 4
+    bits = ADDRESS_BITS[version]
+    try:
+        value = int.from_bytes(socket.inet_pton(ADDRESS_FAMILIES[version], address), "big")
+    except OSError:
+        return parse_network_fallback(line)
+    if not slash:
+        return version, value, value
+    if not (prefix.isascii() and prefix.isdigit()) or int(prefix) > bits:
+        return parse_network_fallback(line)
+    host_bits = bits - int(prefix)
+    start = value >> host_bits << host_bits
+    return version, start, start | ((1 << host_bits) - 1)
+
+
+def parse_network_fallback(line):
+    """Slow path for the forms inet_pton does not take, e.g. a.b.c.d/255.255.0.0."""
+    if "%" in line:
+        return None  # scoped IPv6 addresses are not routable blocks
+    try:
+        network = ipaddress.ip_network(line, strict=False)
+        return network.version, int(network.network_address), int(network.broadcast_address)
+    except ValueError:
+        pass
+    if IPNetwork is not None:
+        try:
+            network = IPNetwork(line)
+            return network.version, network.first, network.last
+        except (AddrFormatError, ValueError, KeyError, TypeError):
+            pass
+    return None
+
+
+def format_address(version, value):
+    if version == 4:
+        return f"{value >> 24}.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"
+    return str(ipaddress.IPv6Address(value))
+
+
+def coalesce(ranges):
+    """Merge sorted (start, end) ranges that overlap or touch."""
+    current_start = current_end = None
+    for start, end in ranges:
+        if current_end is not None and start <= current_end + 1:
+            if end > current_end:
+                current_end = end
+            continue
+        if current_end is not None:
+            yield current_start, current_end
+        current_start, current_end = start, end
+    if current_end is not None:
+        yield current_start, current_end
+
+
+def coalesce_ipv4_numpy(keys):
+    """Sort and coalesce start << 32 | end keys with NumPy; returns the merged keys."""
+    keys = numpy.sort(numpy.frombuffer(keys, dtype=numpy.uint64))
+    if not len(keys):
+        return keys
+    starts = keys >> numpy.uint64(32)
+    reach = numpy.maximum.accumulate(keys & numpy.uint64(0xFFFFFFFF))
+    # A range opens a new block when it starts past everything before it
+    opens = numpy.empty(len(keys), dtype=bool)
+    opens[0] = True
+    opens[1:] = starts[1:] > reach[:-1] + numpy.uint64(1)
+    first = numpy.flatnonzero(opens)
+    last = numpy.append(first[1:] - 1, len(keys) - 1)
+    return (starts[first] << numpy.uint64(32)) | reach[last]
+
+
+def overlay(first, second):
+    """Sweep two streams of sorted, coalesced ranges in one pass.
+
+    Yields (start, end, in_first, in_second) for the pieces of their union,
+    split wherever membership changes.
+    """
+    a = next(first, None)
+    b = next(second, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a[1] < b[0]):
+            yield a[0], a[1], True, False
+            a = next(first, None)
+        elif a is None or b[1] < a[0]:
+            yield b[0], b[1], False, True
+            b = next(second, None)
+        elif a[0] < b[0]:
+            yield a[0], b[0] - 1, True, False
+            a = (b[0], a[1])
+        elif b[0] < a[0]:
+            yield b[0], a[0] - 1, False, True
+            b = (a[0], b[1])
+        else:
+            end = min(a[1], b[1])
+            yield a[0], end, True, True
+            a = next(first, None) if a[1] == end else (end + 1, a[1])
+            b = next(second, None) if b[1] == end else (end + 1, b[1])
+
+
+def subtract(first, second):
+    return coalesce((start, end) for start, end, in_first, in_second in overlay(first, second)
+                    if in_first and not in_second)
+
+
+def intersect(first, second):
+    return coalesce((start, end) for start, end, in_first, in_second in overlay(first, second)
+                    if in_first and in_second)
+
+
+def difference(new, old):
+    """Yield ("+", start, end) for ranges only in new and ("-", ...) for ranges only in old."""
+    for start, end, in_new, in_old in overlay(new, old):
+        if in_new != in_old:
+            yield "+" if in_new else "-", start, end
+
+
+def range_to_cidrs(start, end, bits):
+    """Yield the fewest (network, prefixlen) blocks exactly covering start..end."""
+    while start <= end:
+        # Largest block aligned at start that does not run past end
+        size = (start & -start).bit_length() - 1 if start else bits
+        size = min(size, (end - start + 1).bit_length() - 1)
+        yield start, bits - size
+        start += 1 << size
+
+
+def aggregate(ranges, bits, max_prefixes, min_prefixlen=0):
+    """Cover sorted, disjoint ranges with at most max_prefixes prefixes where possible.
+
+    Starting from the exact blocks, the blocks under the smallest common
+    supernet of two neighbours are repeatedly replaced by that supernet,
+    the one adding the fewest addresses first; supernets shorter than
+    /min_prefixlen are never formed. Returns the resulting (start, end)
+    blocks, the number of exact blocks and the addresses they covered.
+    """
+    starts, ends = [], []
+    covered = 0
+    for start, end in ranges:
+        covered += end - start + 1
+        for network, prefixlen in range_to_cidrs(start, end, bits):
+            starts.append(network)
+            ends.append(network + (1 << bits - prefixlen) - 1)
+    exact = count = len(starts)
+    # Blocks form a linked list; a merge keeps the leftmost node of its run
+    previous = list(range(-1, count - 1))
+    following = list(range(1, count + 1))
+    alive = bytearray(b"\x01") * count
+    candidates = []
+
+    def supernet(left, right):
+        """Return (added, start, end, nodes) for merging everything under left and right's supernet."""
+        size = (starts[left] ^ ends[right]).bit_length()
+        start = starts[left] >> size << size
+        end = start + (1 << size) - 1
+        first, last = left, right
+        while previous[first] >= 0 and starts[previous[first]] >= start:
+            first = previous[first]
+        while following[last] < exact and ends[following[last]] <= end:
+            last = following[last]
+        nodes = [first]
+        while nodes[-1] != last:
+            nodes.append(following[nodes[-1]])
+        added = end - start + 1 - sum(ends[node] - starts[node] + 1 for node in nodes)
+        return added, start, end, nodes
+
+    def push(left, right):
+        if left < 0 or right >= exact:
+            return
+        if bits - (starts[left] ^ ends[right]).bit_length() < min_prefixlen:
+            return
+        added, start = supernet(left, right)[:2]
+        heapq.heappush(candidates, (added, start, left, right))
+
+    for node in range(count - 1):
+        push(node, node + 1)
+    while count > max_prefixes and candidates:
+        added, start, left, right = heapq.heappop(candidates)
+        if not (alive[left] and alive[right] and following[left] == right):
+            continue
+        current = supernet(left, right)
+        if current[:2] != (added, start):
+            # Blocks under it were merged since; requeue at the new cost
+            heapq.heappush(candidates, current[:2] + (left, right))
+            continue
+        _, start, end, nodes = current
+        first, last = nodes[0], nodes[-1]
+        for node in nodes[1:]:
+            alive[node] = 0
+        starts[first], ends[first] = start, end
+        following[first] = following[last]
+        if following[last] < exact:
+            previous[following[last]] = first
+        count -= len(nodes) - 1
+        push(previous[first], first)
+        push(first, following[first])
+
+    blocks = []
+    node = 0
+    while node < exact:
+        blocks.append((starts[node], ends[node]))
+        node = following[node]
+    return blocks, exact, covered
+
+
+class RangeRuns:
+    """(start, end) ranges of one address family, sorted in bounded memory.
+
+    Each range is kept as the single integer start << bits | end, whose
+    order is the order of (start, end).
+    """
+
+    def __init__(self, bits, buffer_size=DEFAULT_BUFFER, tmpdir=None, use_numpy=True):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.buffer_size = buffer_size
+        self.tmpdir = tmpdir
+        # IPv4 keys fit in 64 bits and go in a typed array; IPv6 keys do not
+        self.packed = bits == 32
+        self.use_numpy = use_numpy and numpy is not None and self.packed
+        self.buffer = self.new_buffer()
+        self.runs = []
+
+    def new_buffer(self):
+        return array("Q") if self.packed else []
+
+    def add(self, start, end):
+        self.buffer.append(start << self.bits | end)
+        if len(self.buffer) >= self.buffer_size:
+            self.spill()
+
+    def sorted_buffer(self):
+        """Return the buffer's keys sorted and coalesced."""
+        if self.use_numpy:
+            return coalesce_ipv4_numpy(self.buffer)
+        bits, mask = self.bits, self.mask
+        return [start << bits | end for start, end in coalesce(
+            (key >> bits, key & mask) for key in sorted(self.buffer)
+        )]
+
+    def encode(self, keys):
+        """Serialize sorted keys in the run file format."""
+        if self.use_numpy:
+            return keys.tobytes()
+        if self.packed:
+            return array("Q", keys).tobytes()
+        width = 2 * self.bits // 8
+        return b"".join(key.to_bytes(width, "big") for key in keys)
+
+    def add_run(self, data):
+        """Add a run of sorted, coalesced keys already serialized by encode()."""
+        if not data:
+            return
+        run = tempfile.TemporaryFile(dir=self.tmpdir)
+        run.write(data)
+        run.seek(0)
+        self.runs.append(run)
+
+    def spill(self):
+        self.add_run(self.encode(self.sorted_buffer()))
+        self.buffer = self.new_buffer()
+
+    def read_run(self, run):
+        if self.packed:
+            while True:
+                keys = array("Q", run.read(8 * READ_RECORDS))
+                if not keys:
+                    break
+                yield from keys
+        else:
+            width = 2 * self.bits // 8
+            while True:
+                chunk = run.read(width * READ_RECORDS)
+                if not chunk:
+                    break
+                for offset in range(0, len(chunk), width):
+                    yield int.from_bytes(chunk[offset:offset + width], "big")
+        run.close()
+
+    def merged(self):
+        """Yield the coalesced (start, end) ranges of everything added, in order."""
+        bits, mask = self.bits, self.mask
+        if not self.runs:
+            keys = self.sorted_buffer()
+            if self.use_numpy:
+                keys = keys.tolist()
+            for key in keys:
+                yield key >> bits, key & mask
+            return
+        if self.buffer:
+            self.spill()
+        keys = heapq.merge(*(self.read_run(run) for run in self.runs))
+        yield from coalesce((key >> bits, key & mask) for key in keys)
+
+
+def parse_lines(lines, families, warn):
+    """Add every block in lines to its family's runs; warn(line number, text) for the rest."""
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if line:
+            parsed = parse_network(line)
+            if parsed is None:
+                warn(index + 1, line)
+                continue
+            version, start, end = parsed
+            families[version].add(start, end)
+
+
+def parse_chunk(path, start, end, use_numpy):
+    """Worker: parse bytes start..end of path.
+
+    Returns (newlines in the chunk, [(line number in the chunk, text)] of
+    invalid entries, {version: encoded sorted run}).
+    """
+    with open(path, "rb") as file_obj, mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        text = mapped[start:end].decode("utf-8", "replace")
+    families = {version: RangeRuns(bits, sys.maxsize, use_numpy=use_numpy) for version, bits in ADDRESS_BITS.items()}
+    warnings = []
+    parse_lines(text.split("\n"), families, lambda number, line: warnings.append((number, line)))
+    return text.count("\n"), warnings, {
+        version: runs.encode(runs.sorted_buffer()) for version, runs in families.items()
+    }
+
+
+def chunk_bounds(path, size, chunk_size):
+    """Yield (start, end) byte offsets splitting path into chunks that end at a newline."""
+    with open(path, "rb") as file_obj, mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        position = 0
+        while position < size:
+            end = position + chunk_size
+            if end < size:
+                newline = mapped.find(b"\n", end)
+                end = size if newline < 0 else newline + 1
+            else:
+                end = size
+            yield position, end
+            position = end
+
+
+def read_file(path, families, args, warn):
+    """Parse one input file, in parallel chunks when it is large enough."""
+    try:
+        info = os.stat(path)
+    except OSError as exc:
+        sys.stderr.write(f"Error: cannot read {path}: {exc.strerror}\n")
+        sys.exit(1)
+    if args.jobs <= 1 or not stat.S_ISREG(info.st_mode) or info.st_size < PARALLEL_MIN_SIZE:
+        with open(path, errors="replace") as file_obj:
+            parse_lines(file_obj, families, warn)
+        return
+
+    chunk_size = min(max(info.st_size // (args.jobs * 4), CHUNK_SIZE_MIN), CHUNK_SIZE_MAX)
+    bounds = list(chunk_bounds(path, info.st_size, chunk_size))
+    first_line = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = executor.map(
+            parse_chunk,
+            [path] * len(bounds),
+            [start for start, _ in bounds],
+            [end for _, end in bounds],
+            [not args.no_numpy] * len(bounds),
+        )
+        # map() yields in chunk order, so warnings come out in line order
+        for newlines, warnings, runs in results:
+            for number, line in warnings:
+                warn(first_line + number, line)
+            for version, data in runs.items():
+                families[version].add_run(data)
+            first_line += newlines
+
+
+class IndexWriter:
+    """Writes merged ranges as a lookup index, replacing path atomically on close."""
+
+    def __init__(self, path, tmpdir=None):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        self.file = tempfile.NamedTemporaryFile(dir=directory, prefix=".cidr-index-", delete=False)
+        self.file.write(INDEX_HEADER.pack(INDEX_MAGIC, 0, 0))
+        self.tmpdir = tmpdir
+        self.counts = {4: 0, 6: 0}
+
+    def write(self, version, ranges):
+        """Append the sorted, disjoint ranges of one family (IPv4 first)."""
+        # Starts go straight to the index, ends to a spool appended after them
+        ends = tempfile.TemporaryFile(dir=self.tmpdir)
+        count = 0
+        if version == 4:
+            starts_chunk, ends_chunk = array("I"), array("I")
+            for start, end in ranges:
+                starts_chunk.append(start)
+                ends_chunk.append(end)
+                if len(starts_chunk) >= READ_RECORDS:
+                    count += len(starts_chunk)
+                    starts_chunk.tofile(self.file)
+                    ends_chunk.tofile(ends)
+                    starts_chunk, ends_chunk = array("I"), array("I")
+            count += len(starts_chunk)
+            starts_chunk.tofile(self.file)
+            ends_chunk.tofile(ends)
+        else:
+            for start, end in ranges:
+                self.file.write(start.to_bytes(16, "big"))
+                ends.write(end.to_bytes(16, "big"))
+                count += 1
+        ends.seek(0)
+        while True:
+            data = ends.read(1024 * 1024)
+            if not data:
+                break
+            self.file.write(data)
+        ends.close()
+        self.counts[version] = count
+
+    def close(self):
+        self.file.seek(0)
+        self.file.write(INDEX_HEADER.pack(INDEX_MAGIC, self.counts[4], self.counts[6]))
+        self.file.close()
+        os.chmod(self.file.name, 0o644)
+        os.replace(self.file.name, self.path)
+
+
+class IPv6Column:
+    """Read-only sequence of 16-byte big-endian integers in a buffer, for bisect."""
+
+    def __init__(self, buffer, offset, count):
+        self.buffer = buffer
+        self.offset = offset
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        position = self.offset + 16 * index
+        return int.from_bytes(self.buffer[position:position + 16], "big")
+
+
+class RangeIndex:
+    """A memory-mapped index written by IndexWriter."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file_obj:
+            self.mapped = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mapped) < INDEX_HEADER.size:
+            raise ValueError("file too short")
+        magic, count4, count6 = INDEX_HEADER.unpack_from(self.mapped)
+        if magic != INDEX_MAGIC:
+            raise ValueError("not a cidr-merge index, or written on a machine of other byte order")
+        offset = INDEX_HEADER.size
+        if len(self.mapped) != offset + 8 * count4 + 32 * count6:
+            raise ValueError("truncated index")
+        view = memoryview(self.mapped)
+        self.ipv4 = view[offset:offset + 8 * count4].cast("I")
+        self.columns = {
+            4: (self.ipv4[:count4], self.ipv4[count4:]),
+            6: (IPv6Column(self.mapped, offset + 8 * count4, count6),
+                IPv6Column(self.mapped, offset + 8 * count4 + 16 * count6, count6)),
+        }
+        self.ipv4_arrays = None
+        if numpy is not None and count4:
+            ipv4 = numpy.frombuffer(self.mapped, dtype=numpy.uint32, count=2 * count4, offset=offset)
+            self.ipv4_arrays = ipv4[:count4], ipv4[count4:]
+
+    def contains(self, version, start, end):
+        """True if start..end lies entirely inside one indexed range."""
+        starts, ends = self.columns[version]
+        index = bisect.bisect_right(starts, start) - 1
+        return index >= 0 and end <= ends[index]
+
+    def contains_ipv4(self, addresses):
+        """Vectorized contains() for single IPv4 addresses; returns a bool array."""
+        starts, ends = self.ipv4_arrays
+        addresses = numpy.asarray(addresses, dtype=numpy.uint32)
+        index = numpy.searchsorted(starts, addresses, side="right") - 1
+        found = index >= 0
+        found[found] = addresses[found] <= ends[index[found]]
+        return found
+
+
+def lookup_token(line, field):
+    """Return the field'th whitespace-separated token of line, or None."""
+    tokens = line.split(None, field)
+    return tokens[field - 1] if len(tokens) >= field else None
+
+
+def lookup_lines(index, lines, field, invert, out):
+    """Write the lines whose address (or whole block) is in the index, or is not with invert."""
+    if index.ipv4_arrays is None:
+        for line in lines:
+            token = lookup_token(line, field)
+            parsed = parse_network(token) if token else None
+            if (parsed is not None and index.contains(*parsed)) != invert:
+                out.write(line)
+        return
+
+    # Single IPv4 addresses are answered in batches with searchsorted
+    batch, batch_lines = array("I"), []
+
+    def flush():
+        if batch_lines:
+            for line, member in zip(batch_lines, index.contains_ipv4(batch)):
+                if bool(member) != invert:
+                    out.write(line)
+        batch_lines.clear()
+        del batch[:]
+
+    for line in lines:
+        token = lookup_token(line, field)
+        parsed = parse_network(token) if token else None
+        if parsed is not None and parsed[0] == 4 and parsed[1] == parsed[2]:
+            batch.append(parsed[1])
+            batch_lines.append(line)
+            if len(batch_lines) >= LOOKUP_BATCH:
+                flush()
+            continue
+        # Keep the output in input order
+        flush()
+        if (parsed is not None and index.contains(*parsed)) != invert:
+            out.write(line)
+    flush()
+
+
+def lookup(args):
+    try:
+        index = RangeIndex(args.lookup)
+    except (OSError, ValueError) as exc:
+        sys.stderr.write(f"Error: cannot use index {args.lookup}: {exc}\n")
+        sys.exit(1)
+    for source in args.files or ["-"]:
+        if source == "-":
+            lookup_lines(index, sys.stdin, args.field, args.invert_match, sys.stdout)
+        else:
+            with open(source, errors="replace") as file_obj:
+                lookup_lines(index, file_obj, args.field, args.invert_match, sys.stdout)
+
+
+def parse_prefixlens(value):
+    """Parse --min-prefixlen L or L,L6 into (IPv4, IPv6) prefix lengths."""
+    try:
+        lengths = [int(item) for item in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid prefix length: {value}")
+    if len(lengths) == 1:
+        lengths *= 2
+    if len(lengths) != 2 or not 0 <= lengths[0] <= 32 or not 0 <= lengths[1] <= 128:
+        raise argparse.ArgumentTypeError(f"expected L or L,L6 with L <= 32 and L6 <= 128: {value}")
+    return tuple(lengths)
+
+
+def report_aggregation(version, blocks, exact, covered, max_prefixes, min_prefixlen):
+    """Write how much the coalesced blocks of --max-prefixes over-cover one address family to stderr."""
+    bits = ADDRESS_BITS[version]
+    total = sum(end - start + 1 for start, end in blocks)
+    extra = total - covered
+    prefixlens = [prefixlen for start, end in blocks for _, prefixlen in range_to_cidrs(start, end, bits)]
+    shortest = min(prefixlens, default=bits)
     sys.stderr.write(
-        "Error: python3-netaddr is required. "
-        "Install it (e.g. apt install python3-netaddr)\n"
+        f"IPv{version}: {exact} exact prefixes -> {len(prefixlens)}, covering {total} addresses"
+        f" instead of {covered} (+{extra}, {100 * extra / covered:.2f}% over), shortest /{shortest}\n"
     )
-    sys.exit(1)
+    if len(prefixlens) > max_prefixes:
+        sys.stderr.write(
+            f"Warning: IPv{version} still needs {len(prefixlens)} prefixes,"
+            f" --min-prefixlen {min_prefixlen} allows no further merges\n"
+        )
 
-# Read from stdin
-data = sys.stdin.readlines()
-iplist = []
 
-# fix the data
-for index, line in enumerate(data):
-    line = line.strip()
-    if line:
-        try:
-            iplist.append(IPNetwork(line))
-        except (AddrFormatError, ValueError, KeyError) as e:
-            sys.stderr.write(f"Warning: skipping invalid entry on line {index + 1}: {line}\n")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Merge overlapping/adjacent CIDR blocks read from stdin or files.")
+    parser.add_argument("files", nargs="*", help="files to read instead of stdin ('-' for stdin)")
+    parser.add_argument("--buffer", type=int, default=DEFAULT_BUFFER,
+                        help=f"ranges per address family kept in memory before spilling (default: {DEFAULT_BUFFER})")
+    parser.add_argument("--tmpdir", help="directory for spilled runs (default: system temp dir)")
+    parser.add_argument("--no-numpy", action="store_true", help="sort in pure Python even if NumPy is installed")
+    operation = parser.add_mutually_exclusive_group()
+    operation.add_argument("--subtract", metavar="FILE", help="remove the blocks listed in FILE from the result")
+    operation.add_argument("--intersect", metavar="FILE", help="keep only addresses also listed in FILE")
+    operation.add_argument("--diff", metavar="FILE",
+                           help="compare with the (old) list in FILE: print added blocks as +CIDR, removed as -CIDR")
+    index = parser.add_argument_group("lookup index")
+    index.add_argument("--write-index", metavar="FILE", help="write the result as a binary lookup index instead of CIDRs")
+    index.add_argument("--lookup", metavar="FILE",
+                       help="print the input lines whose address or block is inside the set indexed in FILE")
+    index.add_argument("--field", type=int, default=1,
+                       help="whitespace-separated field of a lookup line holding the address (default: 1)")
+    index.add_argument("-v", "--invert-match", action="store_true", help="with --lookup, print the lines not in the set")
+    lossy = parser.add_argument_group("lossy aggregation")
+    lossy.add_argument("--max-prefixes", type=int, metavar="N",
+                       help="widen blocks into supernets until each address family needs at most N prefixes")
+    lossy.add_argument("--min-prefixlen", type=parse_prefixlens, default=(0, 0), metavar="L[,L6]",
+                       help="never form supernets shorter than /L (IPv6: /L6, default L) with --max-prefixes (default: 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="worker processes for parsing large files (default: number of CPUs)")
+    args = parser.parse_args()
+    if args.write_index and args.diff:
+        parser.error("--write-index cannot store a --diff")
+    if args.field < 1:
+        parser.error("--field counts from 1")
+    if args.max_prefixes is not None and (args.max_prefixes < 1 or args.diff):
+        parser.error("--max-prefixes needs N of at least 1 and cannot be combined with --diff")
+    return args
+
+
+def read_sources(sources, args, name_files=False):
+    """Parse sources ('-' is stdin) into {version: RangeRuns}."""
+    families = {
+        version: RangeRuns(bits, max(1, args.buffer), args.tmpdir, not args.no_numpy)
+        for version, bits in ADDRESS_BITS.items()
+    }
+    for source in sources:
+        where = f" of {source}" if name_files else ""
+
+        def warn(number, line):
+            sys.stderr.write(f"Warning: skipping invalid entry on line {number}{where}: {line}\n")
+
+        if source == "-":
+            parse_lines(sys.stdin, families, warn)
+        else:
+            read_file(source, families, args, warn)
+    return families
+
 
-data.clear()
+def main():
+    args = parse_args()
+    if args.lookup:
+        lookup(args)
+        return
+    sources = args.files or ["-"]
+    other_file = args.subtract or args.intersect or args.diff
+    # Name the file in warnings only when there is more than one input
+    families = read_sources(sources, args, name_files=len(sources) > 1 or other_file is not None)
+    others = read_sources([other_file], args, name_files=True) if other_file else None
 
+    # Output the merged blocks, IPv4 before IPv6 as cidr_merge does
+    out = sys.stdout
+    writer = IndexWriter(args.write_index, args.tmpdir) if args.write_index else None
+    for version, runs in families.items():
+        bits = ADDRESS_BITS[version]
+        merged = runs.merged()
+        if args.diff:
+            for sign, start, end in difference(merged, others[version].merged()):
+                for network, prefixlen in range_to_cidrs(start, end, bits):
+                    out.write(f"{sign}{format_address(version, network)}/{prefixlen}\n")
+            continue
+        if args.subtract:
+            merged = subtract(merged, others[version].merged())
+        elif args.intersect:
+            merged = intersect(merged, others[version].merged())
+        if args.max_prefixes is not None:
+            min_prefixlen = args.min_prefixlen[version == 6]
+            blocks, exact, covered = aggregate(merged, bits, args.max_prefixes, min_prefixlen)
+            # Widened blocks may now touch, and adjacent supernets can join
+            # into shorter prefixes than --min-prefixlen covering the same addresses
+            merged = list(coalesce(blocks))
+            if exact:
+                report_aggregation(version, merged, exact, covered, args.max_prefixes, min_prefixlen)
+        if writer is not None:
+            writer.write(version, merged)
+            continue
+        for start, end in merged:
+            for network, prefixlen in range_to_cidrs(start, end, bits):
+                out.write(f"{format_address(version, network)}/{prefixlen}\n")
+    if writer is not None:
+        writer.close()
 
-# Create an IPSet of the CIDR blocks
-# IPSet automatically runs cidr_merge
-nets = cidr_merge(iplist)
 
-# Output the superset of CIDR blocks
-for cidr in nets:
-    print(cidr)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+JSON view of the dashboard's stack model for /api/stacks.
+
+Environment values are never exposed (only their count), since compose files
+often carry credentials in them.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from generate_dashboard import service_state
+
+# Bump when the JSON documents change shape, so clients holding an ETag refetch.
+API_VERSION = 1
+SERVICE_FIELDS = ("name", "image", "status", "state", "is_running", "urls", "ports", "volumes", "labels", "env_count")
+
+
+def service_document(service_name, service_info):
+    return {
+        "name": service_name,
+        "image": service_info["image"],
+        "status": service_info["status"],
+        "state": service_state(service_info),
+        "is_running": service_info["is_running"],
+        "urls": service_info["urls"],
+        "ports": service_info["ports"],
+        "volumes": service_info["volumes"],
+        "labels": service_info["labels"],
+        "env_count": len(service_info["environment"]),
+    }
+
+
+def stack_document(compose, states=None, name=None, fields=None):
+    """Return one stack as a dict, with its services filtered and projected.
+
+    states is a set of service states to keep, name a lowercase substring that
+    must appear in the stack path or the service name, and fields the service
+    keys to return ("name" is always included).
+    """
+    path = compose["relative_path"]
+    path_matches = name is None or name in path.lower()
+    services = []
+    for service_name, service_info in compose["services"].items():
+        document = service_document(service_name, service_info)
+        if states and document["state"] not in states:
+            continue
+        if not path_matches and name not in service_name.lower():
+            continue
+        if fields:
+            document = {key: value for key, value in document.items() if key == "name" or key in fields}
+        services.append(document)
+    return {"path": path, "services": services}
+
+
+def find_stack(compose_data, path):
+    """Find a stack by its compose file path or by its directory."""
+    path = path.strip("/")
+    for compose in compose_data:
+        relative_path = compose["relative_path"]
+        if path in (relative_path, os.path.dirname(relative_path)):
+            return compose
+    return None
+
+
+def parse_filters(query):
+    """Turn parsed ?status=&name=&fields= values into stack_document arguments."""
+    def values(key):
+        return {item.strip().lower() for value in query.get(key, []) for item in value.split(",") if item.strip()}
+
+    name = " ".join(query.get("name", [])).strip().lower() or None
+    return {"states": values("status") or None, "name": name, "fields": values("fields") or None}
+
+
+def render_stacks(dashboard, path=None, query=None):
+    """Return the JSON body for /api/stacks[/<path>], or None if path is unknown."""
+    filters = parse_filters(query or {})
+    generated_at = datetime.fromtimestamp(dashboard["generated_at"], timezone.utc).isoformat()
+
+    if path:
+        compose = find_stack(dashboard["compose_data"], path)
+        if compose is None:
+            return None
+        document = {"generated_at": generated_at, **stack_document(compose, **filters)}
+    else:
+        stacks = [stack_document(compose, **filters) for compose in dashboard["compose_data"]]
+        if filters["states"] or filters["name"]:
+            stacks = [stack for stack in stacks if stack["services"]]
+        document = {"generated_at": generated_at, "stacks": stacks}
+    return json.dumps(document, default=str).encode("utf-8")
+
+
+def api_etag(dashboard, key):
+    """Weak validator for one API view: the model's ETag, API_VERSION and the path and query."""
+    digest = hashlib.sha256(f"{dashboard['etag']} {API_VERSION} {key}".encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
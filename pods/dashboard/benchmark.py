@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Benchmark the dashboard generation pipeline on synthetic compose trees.
+
+For each size NxM a temporary DATA_DIR with N stacks of M services is
+generated, each service carrying --labels labels and --env environment
+variables, and podman/podman-compose are replaced on PATH by a fake binary
+that answers from a fixture after sleeping --latency seconds. The walk,
+status, parse and render phases are timed separately. Discovery reads each
+stack's compose file to learn its bind mounts, so the walk is timed with the
+parse cache already warm and the cache is emptied again before the parse
+phase: YAML cost shows up under parse, and walk is the directory traversal
+alone. The total is the sum of the phases; the whole pipeline is then timed
+again with the cache warm, and a last run under tracemalloc reports the peak
+memory.
+
+    ./benchmark.py --sizes 10x5,100x10,500x20 --latency 0.05 --status-mode compose
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import generate_dashboard as dashboard
+
+FAKE_PODMAN = """#!{python}
+import json, os, sys, time
+
+time.sleep(float(os.environ.get("BENCH_PODMAN_LATENCY", "0")))
+with open(os.environ["BENCH_PODMAN_FIXTURE"]) as fixture:
+    containers = json.load(fixture)
+args = sys.argv[1:]
+if "-f" in args:
+    project = os.path.basename(os.path.dirname(args[args.index("-f") + 1]))
+    containers = [c for c in containers if c["Labels"]["com.docker.compose.project"] == project]
+json.dump(containers, sys.stdout)
+"""
+
+
+def parse_sizes(value):
+    sizes = []
+    for item in value.split(","):
+        stacks, _, services = item.strip().lower().partition("x")
+        sizes.append((int(stacks), int(services or 1)))
+    return sizes
+
+
+def write_tree(root, stacks, services, labels, env, noise):
+    """Create stacks under root and return the containers podman would report for them."""
+    containers = []
+    for stack in range(stacks):
+        project = f"stack{stack:04d}"
+        stack_dir = os.path.join(root, f"group{stack % 16:02d}", project)
+        # Directories inside the services' bind-mounted ./data/<service>,
+        # which the discovery rules are expected to prune
+        for index in range(noise):
+            os.makedirs(os.path.join(stack_dir, "data", f"svc{index % services:03d}", f"dir{index}"), exist_ok=True)
+        os.makedirs(stack_dir, exist_ok=True)
+
+        lines = ["services:"]
+        for service in range(services):
+            name = f"svc{service:03d}"
+            lines += [
+                f"  {name}:",
+                f"    image: registry.example.com/{project}/{name}:latest",
+                "    ports:",
+                f"      - \"{10000 + service}:80\"",
+                "    volumes:",
+                f"      - ./data/{name}:/data",
+                "    environment:",
+            ]
+            lines += [f"      {name.upper()}_VAR{index}: value-{index}" for index in range(env)]
+            lines += [
+                "    labels:",
+                "      - traefik.enable=true",
+                f"      - traefik.http.routers.{project}-{name}.rule=Host(`{name}.{project}.example.com`)",
+            ]
+            lines += [f"      - com.example.{name}.label{index}=value-{index}" for index in range(labels)]
+            containers.append({
+                "Id": f"{stack:08x}{service:08x}",
+                "Names": [f"{project}_{name}_1"],
+                "State": "running" if service % 4 else "exited",
+                "Labels": {
+                    "com.docker.compose.project": project,
+                    "com.docker.compose.service": name,
+                },
+            })
+        with open(os.path.join(stack_dir, "compose.yaml"), "w") as file_obj:
+            file_obj.write("\n".join(lines) + "\n")
+    return containers
+
+
+def install_fake_podman(bin_dir, fixture_path, latency):
+    os.makedirs(bin_dir, exist_ok=True)
+    script = FAKE_PODMAN.format(python=sys.executable)
+    for name in ("podman", "podman-compose"):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as file_obj:
+            file_obj.write(script)
+        os.chmod(path, 0o755)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
+    os.environ["BENCH_PODMAN_FIXTURE"] = fixture_path
+    os.environ["BENCH_PODMAN_LATENCY"] = str(latency)
+
+
+def collect_status(compose_files, status_mode):
+    """Return {project: {service: state}} the way collect_compose_data would."""
+    if status_mode == "snapshot":
+        return dashboard.get_status_snapshot() or {}
+
+    def stack_status(file_path):
+        project_dir, compose_file = os.path.split(file_path)
+        return os.path.basename(project_dir), dashboard.get_container_status(project_dir, compose_file)
+
+    with ThreadPoolExecutor(max_workers=max(1, dashboard.STATUS_WORKERS)) as executor:
+        return {dashboard.normalize_project_name(project): statuses
+                for project, statuses in executor.map(stack_status, compose_files)}
+
+
+def parse(compose_files, snapshot, parse_cache):
+    with ThreadPoolExecutor(max_workers=max(1, dashboard.STATUS_WORKERS)) as executor:
+        return [item for item in executor.map(
+            lambda path: dashboard.parse_compose_file(path, snapshot, parse_cache), compose_files
+        ) if item]
+
+
+def reset_parse_cache(root):
+    """Give the pipeline an empty parse cache that is never written to disk."""
+    dashboard._parse_cache = dashboard.ComposeParseCache(os.path.join(root, ".parse-cache.json"))
+
+
+def run_pipeline(root, args, phase, cold=True):
+    """Run every phase once, calling phase(name, function) to measure each.
+
+    With cold, the walk runs against a warm parse cache and parse against an
+    empty one, so each phase is charged only for its own work.
+    """
+    if cold:
+        reset_parse_cache(root)
+        dashboard.find_compose_files(root)
+    compose_files = phase("walk", lambda: dashboard.find_compose_files(root))
+    if cold:
+        reset_parse_cache(root)
+    snapshot = phase("status", lambda: collect_status(compose_files, args.status_mode))
+    compose_data = phase("parse", lambda: parse(compose_files, snapshot, dashboard.get_parse_cache()))
+    body = phase("render", lambda: "".join(dashboard.render_html(compose_data, args.render_mode)).encode("utf-8"))
+    return compose_files, compose_data, body
+
+
+def benchmark(root, args):
+    timings = {}
+
+    def timed(name, function):
+        started = time.perf_counter()
+        result = function()
+        timings.setdefault(name, []).append(time.perf_counter() - started)
+        return result
+
+    def untimed(name, function):
+        return function()
+
+    for _ in range(args.repeat):
+        compose_files, compose_data, body = run_pipeline(root, args, timed)
+        timings.setdefault("total", []).append(sum(timings[name][-1] for name in ("walk", "status", "parse", "render")))
+        started = time.perf_counter()
+        run_pipeline(root, args, untimed, cold=False)
+        timings.setdefault("warm", []).append(time.perf_counter() - started)
+
+    peaks = {}
+
+    def traced(name, function):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        peaks[name] = tracemalloc.get_traced_memory()[1] - before
+        return result
+
+    tracemalloc.start()
+    try:
+        run_pipeline(root, args, traced)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "stacks": len(compose_files),
+        "services": sum(len(compose["services"]) for compose in compose_data),
+        "page_bytes": len(body),
+        "seconds": {name: statistics.median(values) for name, values in timings.items()},
+        "peak_bytes": peaks,
+    }
+
+
+def print_table(results):
+    phases = ["walk", "status", "parse", "render", "total", "warm"]
+    header = f"{'size':>10} {'services':>8} " + " ".join(f"{name:>10}" for name in phases)
+    header += f" {'page KiB':>9} {'peak MiB':>9}"
+    print(header)
+    for size, result in results:
+        row = f"{size:>10} {result['services']:>8} "
+        row += " ".join(f"{result['seconds'][name] * 1000:>8.1f}ms" for name in phases)
+        row += f" {result['page_bytes'] / 1024:>9.1f} {max(result['peak_bytes'].values()) / 2 ** 20:>9.1f}"
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("10x5,100x10,500x20"),
+                        help="comma separated STACKSxSERVICES (default: 10x5,100x10,500x20)")
+    parser.add_argument("--labels", type=int, default=20, help="extra labels per service (default: 20)")
+    parser.add_argument("--env", type=int, default=30, help="environment variables per service (default: 30)")
+    parser.add_argument("--noise", type=int, default=5,
+                        help="bind-mounted data directories per stack for discovery to prune (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="seconds the fake podman sleeps per call (default: 0.02)")
+    parser.add_argument("--status-mode", choices=("snapshot", "compose"), default="snapshot",
+                        help="one podman ps for all stacks, or podman compose ps per stack")
+    parser.add_argument("--render-mode", choices=("auto", "static", "client"), default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size; the median is reported")
+    parser.add_argument("--json", action="store_true", help="print results as JSON instead of a table")
+    parser.add_argument("--keep", action="store_true", help="keep the generated trees")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="dashboard-bench-")
+    results = []
+    try:
+        fixture_path = os.path.join(work_dir, "containers.json")
+        install_fake_podman(os.path.join(work_dir, "bin"), fixture_path, args.latency)
+        for stacks, services in args.sizes:
+            size = f"{stacks}x{services}"
+            root = os.path.join(work_dir, size)
+            containers = write_tree(root, stacks, services, args.labels, args.env, args.noise)
+            with open(fixture_path, "w") as file_obj:
+                json.dump(containers, file_obj)
+            os.environ["DATA_DIR"] = root
+            print(f"Benchmarking {size}...", file=sys.stderr)
+            results.append((size, benchmark(root, args)))
+    finally:
+        if args.keep:
+            print(f"Trees kept in {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({size: result for size, result in results}, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Index of compose file locations kept current by a filesystem watcher.
+
+The tree is walked once at startup; after that inotify events (or, where
+inotify is unavailable, a cheap per-directory mtime poll) keep the index up to
+date so generating the dashboard never has to walk DATA_DIR again.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+
+from generate_dashboard import COMPOSE_FILENAMES, DiscoveryRules
+
+# "inotify" falls back to "poll" when the kernel/libc does not support it.
+DISCOVERY_MODE = os.environ.get("DASHBOARD_DISCOVERY", "inotify")
+POLL_INTERVAL = float(os.environ.get("DASHBOARD_POLL_INTERVAL", 5))
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def load_inotify():
+    """Return libc with the inotify functions, or None if they are unavailable."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class ComposeIndex:
+    """Set of compose files under root_dir, updated in the background."""
+
+    def __init__(self, root_dir, mode=DISCOVERY_MODE, poll_interval=POLL_INTERVAL):
+        self.root_dir = os.path.abspath(root_dir)
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.rules = DiscoveryRules(self.root_dir)
+        self._lock = threading.Lock()
+        self._files = set()
+        self._dirs = {}
+        self._libc = None
+        self._fd = None
+        self._watches = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def files(self):
+        with self._lock:
+            return sorted(self._files)
+
+    def start(self):
+        if self.mode == "inotify":
+            self._libc = load_inotify()
+            if self._libc is not None:
+                fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+                if fd >= 0:
+                    self._fd = fd
+                else:
+                    print(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling instead")
+            if self._fd is None:
+                self.mode = "poll"
+
+        self.rescan()
+        target = self._watch_loop if self._fd is not None else self._poll_loop
+        self._thread = threading.Thread(target=target, name=f"compose-index-{self.mode}", daemon=True)
+        self._thread.start()
+        print(f"Indexed {len(self._files)} compose files under {self.root_dir} ({self.mode})")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def rescan(self):
+        """Rebuild the whole index from a fresh walk."""
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self.rules.volume_dirs.clear()
+        for wd in list(self._watches):
+            self._unwatch(wd)
+        self._files.clear()
+        self._dirs.clear()
+        self._add_tree(self.root_dir)
+
+    def _add_tree(self, top):
+        # Watch each directory before listing it so nothing created in between
+        # is missed; this is why os.walk (which lists first) is not used here.
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            self._add_dir(path)
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name in COMPOSE_FILENAMES and entry.is_file():
+                    self._files.add(entry.path)
+                    self.rules.note_compose_file(entry.path)
+            subdirs = [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+            pending.extend(os.path.join(path, name) for name in self.rules.prune(path, subdirs))
+
+    def _remove_tree(self, top):
+        prefix = top + os.sep
+        for path in [p for p in self._dirs if p == top or p.startswith(prefix)]:
+            del self._dirs[path]
+        for wd in [wd for wd, p in self._watches.items() if p == top or p.startswith(prefix)]:
+            self._unwatch(wd)
+        self._files = {p for p in self._files if not p.startswith(prefix)}
+
+    def _add_dir(self, path):
+        try:
+            self._dirs[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        if self._fd is None:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = path
+        elif ctypes.get_errno() == errno.ENOSPC:
+            print(f"Out of inotify watches at {path}; raise fs.inotify.max_user_watches")
+
+    def _unwatch(self, wd):
+        path = self._watches.pop(wd, None)
+        if path is not None and self._fd is not None:
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _watch_loop(self):
+        while not self._stop.is_set():
+            fd = self._fd
+            if fd is None:
+                return
+            try:
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+                buffer = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            with self._lock:
+                self._handle_events(buffer)
+
+    def _handle_events(self, buffer):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                print("inotify queue overflowed, rescanning compose files")
+                self._reset()
+                return
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            parent = self._watches.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    if self.rules.prune(parent, [name]):
+                        self._add_tree(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._remove_tree(path)
+            elif name in COMPOSE_FILENAMES:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._files.add(path)
+                    self.rules.note_compose_file(path)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._files.discard(path)
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                self._poll_once()
+
+    def _poll_once(self):
+        """Re-list only the directories whose mtime changed since the last poll."""
+        for path, mtime_ns in list(self._dirs.items()):
+            if path not in self._dirs:
+                continue  # removed while handling an earlier directory
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                self._remove_tree(path)
+                continue
+            if current == mtime_ns:
+                continue
+            self._dirs[path] = current
+
+            try:
+                entries = list(os.scandir(path))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name in COMPOSE_FILENAMES and entry.is_file() and entry.path not in self._files:
+                    self._files.add(entry.path)
+                    self.rules.note_compose_file(entry.path)
+            subdirs = [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+            for name in self.rules.prune(path, subdirs):
+                child = os.path.join(path, name)
+                if child not in self._dirs:
+                    self._add_tree(child)
+            present = {entry.name for entry in entries}
+            for name in COMPOSE_FILENAMES - present:
+                self._files.discard(os.path.join(path, name))
+
+
+if __name__ == "__main__":
+    import sys
+
+    index = ComposeIndex(sys.argv[1] if len(sys.argv) > 1 else ".").start()
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            print(f"{len(index.files())} compose files")
+    except KeyboardInterrupt:
+        index.stop()
@@ -0,0 +1,120 @@
+"""
+Server-Sent Events for live service status.
+
+StatusBroadcaster diffs the status of every service between successive
+dashboard generations and queues the changes for each connected client. While
+anyone is listening it also keeps the dashboard cache refreshing every
+DASHBOARD_EVENTS_INTERVAL seconds, so one collector serves any number of
+open pages.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from generate_dashboard import service_state
+from metrics import METRICS
+
+EVENTS_INTERVAL = float(os.environ.get("DASHBOARD_EVENTS_INTERVAL", 5))
+# Events a slow client may fall behind by before it is disconnected.
+SUBSCRIBER_BACKLOG = 32
+
+
+def status_snapshot(compose_data):
+    """Return {(stack path, service): status fields} for a generation."""
+    snapshot = {}
+    for compose in compose_data:
+        for service_name, service_info in compose["services"].items():
+            snapshot[(compose["relative_path"], service_name)] = {
+                "status": service_info["status"],
+                "state": service_state(service_info),
+                "is_running": service_info["is_running"],
+            }
+    return snapshot
+
+
+def status_delta(previous, current):
+    """Return the services whose status changed, as event payload dicts."""
+    return [
+        {"path": path, "service": service, **fields}
+        for (path, service), fields in current.items()
+        if previous.get((path, service)) != fields
+    ]
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class StatusBroadcaster:
+    """Fans status changes out to SSE subscribers."""
+
+    def __init__(self, cache, interval=EVENTS_INTERVAL):
+        self.cache = cache
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._snapshot = {}
+        self._wakeup = threading.Event()
+
+    def subscribe(self):
+        """Register a client; returns its queue and the current snapshot event."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_BACKLOG)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            METRICS.set("dashboard_sse_subscribers", len(self._subscribers))
+            initial = format_event("snapshot", status_delta({}, self._snapshot))
+        self._wakeup.set()
+        return subscriber, initial
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            METRICS.set("dashboard_sse_subscribers", len(self._subscribers))
+
+    def publish(self, dashboard):
+        """Cache listener: diff the new generation against the last one."""
+        current = status_snapshot(dashboard["compose_data"])
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = current
+            if not self._subscribers:
+                return
+            if previous and previous.keys() != current.keys():
+                # Stacks or services were added or removed; cards cannot be patched
+                message = format_event("reload", {})
+            else:
+                delta = status_delta(previous, current)
+                if not delta:
+                    return
+                message = format_event("status", delta)
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(message)
+                except queue.Full:
+                    # Too far behind; dropping it makes its handler hang up
+                    self._subscribers.discard(subscriber)
+
+    def is_subscribed(self, subscriber):
+        with self._lock:
+            return subscriber in self._subscribers
+
+    def start(self):
+        """Refresh the cache every interval while there are subscribers."""
+        def loop():
+            while True:
+                with self._lock:
+                    active = bool(self._subscribers)
+                if not active:
+                    self._wakeup.wait()
+                    self._wakeup.clear()
+                    continue
+                if self.cache.age() >= self.interval:
+                    self.cache.refresh()
+                time.sleep(min(1.0, self.interval))
+
+        thread = threading.Thread(target=loop, name="status-events", daemon=True)
+        thread.start()
+        return thread
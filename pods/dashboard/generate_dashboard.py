@@ -3,14 +3,31 @@
 Script to generate a dashboard showing all podman compose files and their services.
 """
 
+import fnmatch
+import gzip
+import hashlib
+import json
 import os
 import re
 import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
 import yaml
 
+from metrics import METRICS
+from traefik import service_urls
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 COMPOSE_FILENAMES = {
     "docker-compose.yml",
     "docker-compose.yaml",
@@ -20,14 +37,169 @@ COMPOSE_FILENAMES = {
     "podman-compose.yaml",
 }
 
+# Stacks whose status is collected concurrently, and how long a single podman
+# call may take before that stack is reported as unknown.
+STATUS_WORKERS = int(os.environ.get("DASHBOARD_STATUS_WORKERS", 8))
+STATUS_TIMEOUT = float(os.environ.get("DASHBOARD_STATUS_TIMEOUT", 10))
+
+# "snapshot" asks podman once for every container and splits the result per
+# stack; "compose" runs `podman compose ps` for each stack separately.
+# "events" (the server's default) follows `podman events` from a long-lived
+# collector and falls back to "snapshot" when run as a one-off script.
+STATUS_MODE = os.environ.get("DASHBOARD_STATUS_MODE", "events")
+
+PROJECT_LABELS = ("com.docker.compose.project", "io.podman.compose.project")
+SERVICE_LABELS = ("com.docker.compose.service", "io.podman.compose.service")
+
+# Parsed service definitions are cached on disk so unchanged compose files
+# need no YAML work, even after a restart. With DASHBOARD_PARSE_CACHE_HASH=1 a
+# file whose mtime changed but whose content did not (touch, git checkout) is
+# still served from the cache.
+PARSE_CACHE_FILE = os.environ.get(
+    "DASHBOARD_PARSE_CACHE", str(Path(__file__).parent / ".cache" / "compose-parse.json")
+)
+PARSE_CACHE_HASH = os.environ.get("DASHBOARD_PARSE_CACHE_HASH", "0") == "1"
+PARSE_CACHE_VERSION = 2
+
+# Brotli quality for the precompressed "br" variant. The default 11 takes
+# seconds on a large page and the variant is rebuilt on every regeneration;
+# 5 still beats gzip -9 at about gzip's speed.
+BROTLI_QUALITY = int(os.environ.get("DASHBOARD_BROTLI_QUALITY", 5))
+
+# "static" sends every service card in the page; "client" sends the service
+# model as JSON and lets the browser build cards lazily; "auto" switches to
+# "client" above CLIENT_RENDER_THRESHOLD services.
+RENDER_MODE = os.environ.get("DASHBOARD_RENDER_MODE", "auto")
+CLIENT_RENDER_THRESHOLD = int(os.environ.get("DASHBOARD_CLIENT_RENDER_THRESHOLD", 200))
+
+# Discovery only descends into directories that can hold compose stacks.
+# Patterns follow .gitignore rules: a bare name matches at any depth, a
+# pattern containing "/" is anchored at DATA_DIR, and "!pattern" re-includes.
+# Extra patterns come from DASHBOARD_IGNORE (comma separated) and from a
+# .dashboardignore file at the top of DATA_DIR.
+DEFAULT_IGNORE = ["dashboard", ".*", "node_modules", "__pycache__"]
+IGNORE_FILE = ".dashboardignore"
+DISCOVERY_IGNORE = [p.strip() for p in os.environ.get("DASHBOARD_IGNORE", "").split(",") if p.strip()]
+DISCOVERY_MAX_DEPTH = int(os.environ.get("DASHBOARD_MAX_DEPTH", 0)) or None
+# Directories owned by someone other than the owner of DATA_DIR are treated as
+# container volume data: rootless podman maps container users into the subuid
+# range, so inside the dashboard's own rootless container the user's files
+# show up as UID 0 and volume data as other container UIDs. Set
+# DASHBOARD_PRUNE_FOREIGN_OWNER=0 to disable this.
+PRUNE_FOREIGN_OWNER = os.environ.get("DASHBOARD_PRUNE_FOREIGN_OWNER", "1") == "1"
+# Optionally also prune directories owned by a UID at or above this (e.g.
+# 100000 for subuids when running on the host); 0 disables the check.
+PRUNE_UID_MIN = int(os.environ.get("DASHBOARD_PRUNE_UID_MIN", 0))
+
+
+def bind_mount_dirs(compose_dir, volumes):
+    """Return the local directories a service bind-mounts, as absolute paths."""
+    mounts = set()
+    for volume in volumes or []:
+        if isinstance(volume, dict):
+            source = volume.get("source") if volume.get("type", "bind") == "bind" else None
+        else:
+            source = str(volume).split(":", 1)[0] if ":" in str(volume) else None
+        if not source or not source.startswith("."):
+            continue  # named volume, or a host path not visible under DATA_DIR
+        path = os.path.normpath(os.path.join(compose_dir, source))
+        # Stacks that mount their own or a parent directory (the dashboard
+        # mounts the whole tree) must not prune discovery.
+        if compose_dir == path or compose_dir.startswith(path + os.sep):
+            continue
+        mounts.add(path)
+    return mounts
+
+
+class DiscoveryRules:
+    """Decides which directories compose discovery descends into."""
+
+    def __init__(self, root_dir, patterns=None, max_depth=DISCOVERY_MAX_DEPTH, uid_min=PRUNE_UID_MIN,
+                 foreign_owner=PRUNE_FOREIGN_OWNER):
+        self.root_dir = os.path.abspath(root_dir)
+        self.max_depth = max_depth
+        self.uid_min = uid_min
+        self.owner_uid = None
+        if foreign_owner:
+            try:
+                self.owner_uid = os.stat(self.root_dir).st_uid
+            except OSError:
+                pass
+        self.volume_dirs = set()
+        if patterns is None:
+            patterns = DEFAULT_IGNORE + DISCOVERY_IGNORE + self._read_ignore_file()
+        self.patterns = [self._compile(pattern) for pattern in patterns]
+
+    def _read_ignore_file(self):
+        try:
+            with open(os.path.join(self.root_dir, IGNORE_FILE), "r", encoding="utf-8") as file_obj:
+                lines = [line.strip() for line in file_obj]
+        except OSError:
+            return []
+        return [line for line in lines if line and not line.startswith("#")]
+
+    @staticmethod
+    def _compile(pattern):
+        negate = pattern.startswith("!")
+        pattern = pattern[1:] if negate else pattern
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        return negate, anchored, pattern.lstrip("/")
+
+    def is_ignored(self, rel_path):
+        name = rel_path.rsplit("/", 1)[-1]
+        ignored = False
+        for negate, anchored, pattern in self.patterns:
+            if fnmatch.fnmatchcase(rel_path if anchored else name, pattern):
+                ignored = not negate
+        return ignored
+
+    def note_compose_file(self, file_path):
+        """Learn the bind-mounted data directories of a discovered stack."""
+        definition = load_compose_definition(file_path, get_parse_cache())
+        if definition is None:
+            return
+        compose_dir = os.path.dirname(os.path.abspath(file_path))
+        for service in definition["services"].values():
+            self.volume_dirs.update(bind_mount_dirs(compose_dir, service.get("volumes")))
+
+    def prune(self, root, dirs):
+        """Return the subdirectories of root that compose discovery descends into."""
+        root = os.path.abspath(root)
+        rel_root = os.path.relpath(root, self.root_dir)
+        rel_root = "" if rel_root == "." else rel_root.replace(os.sep, "/") + "/"
+        if self.max_depth is not None and rel_root.count("/") >= self.max_depth:
+            return []
+
+        kept = []
+        for name in dirs:
+            path = os.path.join(root, name)
+            if self.is_ignored(rel_root + name) or path in self.volume_dirs:
+                continue
+            if self.uid_min or self.owner_uid is not None:
+                try:
+                    uid = os.lstat(path).st_uid
+                except OSError:
+                    continue
+                if self.owner_uid is not None and uid != self.owner_uid:
+                    continue
+                if self.uid_min and uid >= self.uid_min:
+                    continue
+            kept.append(name)
+        return kept
+
 
-def find_compose_files(root_dir):
+def find_compose_files(root_dir, rules=None):
+    rules = rules or DiscoveryRules(root_dir)
     compose_files = []
     for root, dirs, files in os.walk(root_dir):
-        dirs[:] = [d for d in dirs if d != "dashboard" and not d.startswith(".")]
+        # os.walk is top-down, so the stack in this directory is known before
+        # deciding which of its subdirectories are its volume data.
         for file_name in files:
             if file_name in COMPOSE_FILENAMES:
                 compose_files.append(os.path.join(root, file_name))
+                rules.note_compose_file(compose_files[-1])
+        dirs[:] = rules.prune(root, dirs)
     return sorted(compose_files)
 
 
@@ -47,6 +219,94 @@ def parse_service_name(container_name, project_name):
     return container_name
 
 
+def normalize_project_name(name):
+    return re.sub(r"[^-_a-z0-9]", "", str(name).lower())
+
+
+def container_state(container):
+    return str(
+        container.get("State")
+        or container.get("Status")
+        or container.get("state")
+        or "unknown"
+    )
+
+
+def compose_container(labels, name):
+    """Return (project, service) for a compose-managed container, or None."""
+    labels = labels or {}
+    project = next((labels[key] for key in PROJECT_LABELS if labels.get(key)), None)
+    if not project:
+        return None
+    service = next((labels[key] for key in SERVICE_LABELS if labels.get(key)), None)
+    return normalize_project_name(project), service or parse_service_name(name, project)
+
+
+def list_compose_containers():
+    """Return {container id: (project, service, state)} from one `podman ps`.
+
+    Returns None when podman could not be queried.
+    """
+    command = ["podman", "ps", "--all", "--format", "json"]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=STATUS_TIMEOUT)
+    except FileNotFoundError:
+        METRICS.inc("dashboard_subprocess_failures_total", command="podman ps", reason="missing")
+        return None
+    except subprocess.TimeoutExpired:
+        METRICS.inc("dashboard_subprocess_failures_total", command="podman ps", reason="timeout")
+        print(f"Timed out after {STATUS_TIMEOUT}s collecting status using {' '.join(command)}")
+        return None
+    if result.returncode != 0:
+        METRICS.inc("dashboard_subprocess_failures_total", command="podman ps", reason="exit")
+        print(f"Error collecting status using {' '.join(command)}: {result.stderr.strip()}")
+        return None
+
+    try:
+        containers = yaml.safe_load(result.stdout) or []
+    except yaml.YAMLError as exc:
+        METRICS.inc("dashboard_subprocess_failures_total", command="podman ps", reason="output")
+        print(f"Error collecting status using {' '.join(command)}: {exc}")
+        return None
+    if not isinstance(containers, list):
+        METRICS.inc("dashboard_subprocess_failures_total", command="podman ps", reason="output")
+        return None
+
+    indexed = {}
+    for position, container in enumerate(containers):
+        if not isinstance(container, dict):
+            continue
+        names = container.get("Names") or []
+        name = names[0] if isinstance(names, list) and names else str(names)
+        identity = compose_container(container.get("Labels"), name)
+        if identity is None:
+            continue
+        container_id = container.get("Id") or container.get("ID") or f"{name}#{position}"
+        indexed[container_id] = (*identity, container_state(container))
+    return indexed
+
+
+def index_statuses(containers):
+    """Fold {container id: (project, service, state)} into {project: {service: state}}."""
+    snapshot = {}
+    for project, service, state in containers.values():
+        statuses = snapshot.setdefault(project, {})
+        # With scaled services keep the running replica's state visible.
+        if service not in statuses or "running" not in statuses[service].lower():
+            statuses[service] = state
+    return snapshot
+
+
+def get_status_snapshot():
+    """Return {project: {service: state}} for every container podman knows about.
+
+    Returns None when podman could not be queried, so callers can fall back to
+    the per-stack `podman compose ps` path.
+    """
+    containers = list_compose_containers()
+    return None if containers is None else index_statuses(containers)
+
+
 def get_container_status(project_dir, compose_file):
     compose_file_path = os.path.join(project_dir, compose_file)
     project_name = os.path.basename(project_dir)
@@ -56,67 +316,173 @@ def get_container_status(project_dir, compose_file):
         ["podman-compose", "-f", compose_file_path, "ps", "--format", "json"],
     ]
 
-    for command in commands:
+    for position, command in enumerate(commands):
+        label = f"{command[0]} ps" if command[0] != "podman" else "podman compose ps"
+        if position:
+            METRICS.inc("dashboard_status_fallbacks_total", to=command[0])
         try:
-            result = subprocess.run(command, capture_output=True, text=True, cwd=project_dir)
+            result = subprocess.run(
+                command, capture_output=True, text=True, cwd=project_dir, timeout=STATUS_TIMEOUT
+            )
             if result.returncode != 0 or not result.stdout.strip():
+                METRICS.inc("dashboard_subprocess_failures_total", command=label, reason="exit")
                 continue
 
             containers = yaml.safe_load(result.stdout)
             if not isinstance(containers, list):
+                METRICS.inc("dashboard_subprocess_failures_total", command=label, reason="output")
                 continue
 
             statuses = {}
             for container in containers:
                 if not isinstance(container, dict):
                     continue
-                name = container.get("Names") or container.get("Names") or container.get("name") or ""
-                state = (
-                    container.get("State")
-                    or container.get("Status")
-                    or container.get("state")
-                    or "unknown"
-                )
+                names = container.get("Names") or container.get("name") or ""
+                name = names[0] if isinstance(names, list) and names else str(names)
                 service_name = parse_service_name(name, project_name)
-                statuses[service_name] = str(state)
+                statuses[service_name] = container_state(container)
             return statuses
         except FileNotFoundError:
+            METRICS.inc("dashboard_subprocess_failures_total", command=label, reason="missing")
             continue
+        except subprocess.TimeoutExpired:
+            METRICS.inc("dashboard_subprocess_failures_total", command=label, reason="timeout")
+            print(f"Timed out after {STATUS_TIMEOUT}s collecting status using {' '.join(command)}")
+            break
         except Exception as exc:
+            METRICS.inc("dashboard_subprocess_failures_total", command=label, reason="output")
             print(f"Error collecting status using {' '.join(command)}: {exc}")
 
     return {}
 
 
 def extract_urls(labels):
-    urls = []
-    if isinstance(labels, dict):
-        labels = [f"{key}={value}" for key, value in labels.items()]
-    for label in labels or []:
-        if "traefik.http.routers." in str(label) and ".rule=" in str(label):
-            for host in re.findall(r"Host\(`([^`]+)`\)", str(label)):
-                urls.append(f"http://{host}")
-    return sorted(set(urls))
+    return service_urls(labels)
+
+
+class ComposeParseCache:
+    """Parsed compose definitions keyed by path, mtime and size, persisted as JSON."""
+
+    def __init__(self, path=PARSE_CACHE_FILE, use_hash=PARSE_CACHE_HASH):
+        self.path = path
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._seen = set()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file_obj:
+                data = json.load(file_obj)
+        except FileNotFoundError:
+            return
+        except Exception as exc:
+            print(f"Ignoring unreadable parse cache {self.path}: {exc}")
+            return
+        if isinstance(data, dict) and data.get("version") == PARSE_CACHE_VERSION:
+            self._entries = data.get("entries") or {}
+
+    def lookup(self, file_path, stat):
+        with self._lock:
+            self._seen.add(file_path)
+            entry = self._entries.get(file_path)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                self.hits += 1
+                METRICS.inc("dashboard_parse_cache_total", result="hit")
+                return entry["definition"]
+
+        if entry and self.use_hash and entry.get("sha256") and entry["size"] == stat.st_size:
+            try:
+                with open(file_path, "rb") as file_obj:
+                    digest = hashlib.sha256(file_obj.read()).hexdigest()
+            except OSError:
+                digest = None
+            if digest == entry["sha256"]:
+                with self._lock:
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    self._dirty = True
+                    self.hits += 1
+                METRICS.inc("dashboard_parse_cache_total", result="hit")
+                return entry["definition"]
+
+        with self._lock:
+            self.misses += 1
+        METRICS.inc("dashboard_parse_cache_total", result="miss")
+        return None
+
+    def store(self, file_path, stat, content, definition):
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "definition": definition}
+        if self.use_hash:
+            entry["sha256"] = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self._entries[file_path] = entry
+            self._dirty = True
+
+    def save(self):
+        """Write the cache atomically, dropping files not seen since the last save."""
+        with self._lock:
+            stale = set(self._entries) - self._seen
+            for file_path in stale:
+                del self._entries[file_path]
+            dirty = self._dirty or bool(stale)
+            self._seen = set()
+            self._dirty = False
+            if not dirty:
+                return
+            payload = json.dumps(
+                {"version": PARSE_CACHE_VERSION, "entries": self._entries}, default=str
+            )
+
+        cache_dir = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".compose-parse-")
+            with os.fdopen(fd, "w", encoding="utf-8") as file_obj:
+                file_obj.write(payload)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            print(f"Error writing parse cache {self.path}: {exc}")
+
 
+_parse_cache = None
 
-def parse_compose_file(file_path):
+
+def get_parse_cache():
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = ComposeParseCache()
+    return _parse_cache
+
+
+def load_compose_definition(file_path, parse_cache=None):
+    """Return the status-independent part of a compose file, using the cache when possible."""
     try:
-        with open(file_path, "r", encoding="utf-8") as file_obj:
-            data = yaml.safe_load(file_obj)
-    except Exception as exc:
+        stat = os.stat(file_path)
+    except OSError as exc:
         print(f"Error parsing compose file {file_path}: {exc}")
         return None
 
-    project_dir = os.path.dirname(file_path)
-    compose_file = os.path.basename(file_path)
-    status_map = get_container_status(project_dir, compose_file)
+    if parse_cache is not None:
+        definition = parse_cache.lookup(file_path, stat)
+        if definition is not None:
+            return definition
+
+    try:
+        with open(file_path, "rb") as file_obj:
+            content = file_obj.read()
+        data = yaml.safe_load(content)
+    except Exception as exc:
+        print(f"Error parsing compose file {file_path}: {exc}")
+        return None
 
     services = {}
     for service_name, service_config in (data or {}).get("services", {}).items():
+        service_config = service_config or {}
         labels = service_config.get("labels", [])
-        service_status = status_map.get(service_name, "unknown")
-        lower_status = service_status.lower()
-        is_running = "running" in lower_status or "healthy" in lower_status or "up" in lower_status
 
         environment = service_config.get("environment", [])
         if isinstance(environment, dict):
@@ -128,9 +494,38 @@ def parse_compose_file(file_path):
             "environment": environment,
             "volumes": service_config.get("volumes", []),
             "labels": labels,
+            "urls": extract_urls(labels),
+        }
+
+    definition = {"name": (data or {}).get("name"), "services": services}
+    if parse_cache is not None:
+        parse_cache.store(file_path, stat, content, definition)
+    return definition
+
+
+def parse_compose_file(file_path, snapshot=None, parse_cache=None):
+    definition = load_compose_definition(file_path, parse_cache)
+    if definition is None:
+        return None
+
+    project_dir = os.path.dirname(file_path)
+    compose_file = os.path.basename(file_path)
+    if snapshot is not None:
+        project_name = definition["name"] or os.path.basename(project_dir)
+        status_map = snapshot.get(normalize_project_name(project_name), {})
+    else:
+        status_map = get_container_status(project_dir, compose_file)
+
+    services = {}
+    for service_name, service_definition in definition["services"].items():
+        service_status = status_map.get(service_name, "unknown")
+        lower_status = service_status.lower()
+        is_running = "running" in lower_status or "healthy" in lower_status or "up" in lower_status
+
+        services[service_name] = {
+            **service_definition,
             "status": service_status,
             "is_running": is_running,
-            "urls": extract_urls(labels),
         }
 
     services = dict(sorted(services.items(), key=lambda item: (not item[1]["is_running"], item[0])))
@@ -143,30 +538,138 @@ def parse_compose_file(file_path):
     }
 
 
-def generate_html(compose_data, output_file):
-    generation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def service_state(service_info):
+    """Classify a service as "running", "stopped" or "unknown"."""
+    if service_info["is_running"]:
+        return "running"
+    lower_status = service_info["status"].lower()
+    return "stopped" if "exited" in lower_status or "created" in lower_status else "unknown"
+
+
+def client_render_model(compose_data):
+    """Compact JSON of the services for client-side rendering.
+
+    Each stack is [path, services] and each service is
+    [name, image, status, state, urls, ports, volumes, env vars]; the last
+    three are counts. "<" is escaped so the JSON can sit inside a <script>.
+    """
+    model = [
+        [
+            compose["relative_path"],
+            [
+                [
+                    service_name,
+                    str(service_info["image"]),
+                    service_info["status"],
+                    service_state(service_info),
+                    service_info["urls"],
+                    len(service_info["ports"]),
+                    len(service_info["volumes"]),
+                    len(service_info["environment"]),
+                ]
+                for service_name, service_info in compose["services"].items()
+            ],
+        ]
+        for compose in compose_data
+    ]
+    return json.dumps(model, separators=(",", ":"), default=str).replace("<", "\\u003c")
+
+
+class PageTemplate:
+    """Page text split once into literal runs and {{name}} slots.
+
+    Rendering only joins the literals with the slot values, so the static
+    CSS/JS shell costs nothing per request. A slot value may be a string, a
+    callable returning one, or an iterable of fragments that is streamed.
+    """
+
+    FIELD = re.compile(r"\{\{(\w+)\}\}")
+
+    def __init__(self, text):
+        # Part of the page ETag, so a changed shell or script is refetched
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        parts = self.FIELD.split(text)
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+
+    def stream(self, values):
+        # Runs of literals and string values go out as one fragment; only an
+        # iterable value (the stack sections) splits the page.
+        pending = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            value = values[field]
+            if callable(value):
+                value = value()
+            if isinstance(value, str):
+                pending.append(value)
+            else:
+                yield "".join(pending)
+                pending = []
+                yield from value
+            pending.append(literal)
+        yield "".join(pending)
+
+
+def render_html(compose_data, render_mode=None):
+    """Yield the page in fragments: the shell and summary, one per stack, then the scripts.
+
+    In "client" render mode the stacks are sent as empty groups plus a JSON
+    model, and the page builds the cards of a group only once it is expanded
+    and scrolled into view ("auto" picks it above CLIENT_RENDER_THRESHOLD
+    services).
+    """
     total_services = sum(len(compose["services"]) for compose in compose_data)
-    running_services = sum(
-        1 for compose in compose_data for service in compose["services"].values() if service["is_running"]
-    )
-
-    compose_sections = ""
-    for compose in compose_data:
+    client = resolve_render_mode(compose_data, render_mode) == "client"
+
+    return PAGE_TEMPLATES["client" if client else "static"].stream({
+        "stack_count": str(len(compose_data)),
+        "service_count": str(total_services),
+        "running_count": str(sum(
+            1 for compose in compose_data for service in compose["services"].values() if service["is_running"]
+        )),
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "sections": render_sections(compose_data, client),
+        "model": partial(client_render_model, compose_data),
+    })
+
+
+def resolve_render_mode(compose_data, render_mode=None):
+    """Return "static" or "client" for render_mode, RENDER_MODE by default."""
+    render_mode = render_mode or RENDER_MODE
+    if render_mode == "auto":
+        total_services = sum(len(compose["services"]) for compose in compose_data)
+        return "client" if total_services > CLIENT_RENDER_THRESHOLD else "static"
+    return "client" if render_mode == "client" else "static"
+
+
+def render_sections(compose_data, client=False):
+    """Yield one fragment per stack: its cards, or an empty group for client rendering."""
+    for position, compose in enumerate(compose_data):
         relative_path = compose["relative_path"]
         services = compose["services"]
 
-        cards = ""
+        if client:
+            # Reserve roughly the final height so lazy groups don't all
+            # scroll into view at once while still empty
+            rows = (len(services) + 2) // 3
+            yield f'''
+        <div class="compose-group" data-compose-path="{relative_path.lower()}" data-stack="{position}">
+            <div class="compose-header"><h3 class="compose-title"><i class="fas fa-file-code"></i> {relative_path}</h3><div class="expand-icon">−</div></div>
+            <div class="compose-body expanded"><div class="service-grid" style="min-height:{rows * 150}px"></div></div>
+        </div>'''
+            continue
+
+        cards = []
         for service_name, service_info in services.items():
             status = service_info["status"]
-            lower_status = status.lower()
-            status_class = "running" if service_info["is_running"] else ("stopped" if "exited" in lower_status or "created" in lower_status else "unknown")
+            status_class = service_state(service_info)
             badge_class = f"status-badge-{status_class}"
             links = "".join(
-                f'<a href="{url}" target="_blank" class="service-link"><i class="fas fa-external-link-alt"></i> {url.replace("http://", "")}</a>'
+                f'<a href="{url}" target="_blank" class="service-link"><i class="fas fa-external-link-alt"></i> {url.split("://", 1)[-1]}</a>'
                 for url in service_info["urls"]
             ) or '<span class="no-links"><i class="fas fa-chain-broken"></i> No direct link</span>'
 
-            cards += f'''
+            cards.append(f'''
             <div class="service-card {status_class}" data-service-name="{service_name.lower()}" data-compose-path="{relative_path.lower()}">
                 <div class="service-header">
                     <div class="status-indicator status-{status_class}"></div>
@@ -180,59 +683,220 @@ def generate_html(compose_data, output_file):
                     <span><i class="fas fa-folder"></i> {len(service_info['volumes'])} volumes</span>
                     <span><i class="fas fa-leaf"></i> {len(service_info['environment'])} env vars</span>
                 </div>
-            </div>'''
+            </div>''')
 
-        if not cards:
-            cards = '<div class="no-services">No services defined</div>'
+        cards = "".join(cards) or '<div class="no-services">No services defined</div>'
 
-        compose_sections += f'''
+        yield f'''
         <div class="compose-group" data-compose-path="{relative_path.lower()}">
             <div class="compose-header"><h3 class="compose-title"><i class="fas fa-file-code"></i> {relative_path}</h3><div class="expand-icon">−</div></div>
             <div class="compose-body expanded"><div class="service-grid">{cards}</div></div>
         </div>'''
 
-    html = f'''<!doctype html>
+
+
+# Static page shell, filled in by PageTemplate; everything outside the {{slots}}
+# is sent verbatim.
+PAGE_HEAD = '''<!doctype html>
 <html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1"><title>Podman Compose Dashboard</title>
 <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
 <style>
-:root{{--bg:#f5f7fa;--panel:#fff;--text:#333;--muted:#666;--border:#ddd;--header:linear-gradient(135deg,#6a11cb 0%,#2575fc 100%);--link:#3498db;--linkh:#2980b9;--card:#f8f9fa}}
-.dark-mode{{--bg:#121212;--panel:#1f1f1f;--text:#efefef;--muted:#b0b0b0;--border:#3f3f3f;--card:#292929;--link:#4da6ff;--linkh:#3976aa}}
-body{{font-family:Segoe UI,sans-serif;margin:0;background:var(--bg);color:var(--text);padding:20px}}.container{{max-width:1200px;margin:auto}}
-header{{background:var(--header);color:#fff;border-radius:12px;padding:20px;box-shadow:0 4px 14px rgba(0,0,0,.15)}}
-.controls{{display:flex;gap:12px;margin-top:14px}} .search-box{{flex:1;padding:12px;border-radius:999px;border:none}} .theme-toggle{{width:40px;height:40px;border-radius:50%;border:1px solid #fff;background:transparent;color:#fff;cursor:pointer}}
-.summary{{margin-top:14px;display:flex;gap:10px;flex-wrap:wrap}} .pill{{background:rgba(255,255,255,.18);padding:6px 12px;border-radius:999px}}
-.compose-group{{background:var(--panel);border-radius:10px;margin-top:18px;overflow:hidden;border:1px solid var(--border)}} .compose-header{{background:#2c3e50;color:#fff;padding:12px 16px;display:flex;justify-content:space-between;cursor:pointer}}
-.compose-body.expanded{{padding:16px}} .compose-body{{max-height:0;overflow:hidden}}
-.service-grid{{display:grid;grid-template-columns:repeat(auto-fill,minmax(280px,1fr));gap:14px}} .service-card{{background:var(--card);padding:14px;border-radius:10px;border-left:4px solid #f1c40f}}
-.service-card.running{{border-left-color:#2ecc71}} .service-card.stopped{{border-left-color:#e74c3c}}
-.service-header{{display:flex;align-items:center;gap:10px;margin-bottom:10px}} .status-indicator{{width:10px;height:10px;border-radius:50%}} .status-running{{background:#2ecc71}} .status-stopped{{background:#e74c3c}} .status-unknown{{background:#f1c40f}}
-.logo-container{{width:34px;height:34px;border-radius:50%;display:flex;align-items:center;justify-content:center;background:#4b7bec;color:#fff;font-weight:700}} .service-name{{font-weight:600;display:flex;justify-content:space-between;gap:8px;flex:1}}
-.service-status{{font-size:.75em;padding:2px 8px;border-radius:999px}} .status-badge-running{{background:#d4edda;color:#155724}} .status-badge-stopped{{background:#f8d7da;color:#721c24}} .status-badge-unknown{{background:#fff3cd;color:#856404}}
-.service-link{{display:inline-flex;background:var(--link);color:#fff;padding:5px 10px;border-radius:999px;text-decoration:none;font-size:.82em}} .service-link:hover{{background:var(--linkh)}} .service-links{{display:flex;gap:8px;flex-wrap:wrap}}
-.service-meta{{margin-top:10px;display:flex;gap:10px;flex-wrap:wrap;font-size:.85em;color:var(--muted)}} .hidden{{display:none!important}}
+:root{--bg:#f5f7fa;--panel:#fff;--text:#333;--muted:#666;--border:#ddd;--header:linear-gradient(135deg,#6a11cb 0%,#2575fc 100%);--link:#3498db;--linkh:#2980b9;--card:#f8f9fa}
+.dark-mode{--bg:#121212;--panel:#1f1f1f;--text:#efefef;--muted:#b0b0b0;--border:#3f3f3f;--card:#292929;--link:#4da6ff;--linkh:#3976aa}
+body{font-family:Segoe UI,sans-serif;margin:0;background:var(--bg);color:var(--text);padding:20px}.container{max-width:1200px;margin:auto}
+header{background:var(--header);color:#fff;border-radius:12px;padding:20px;box-shadow:0 4px 14px rgba(0,0,0,.15)}
+.controls{display:flex;gap:12px;margin-top:14px} .search-box{flex:1;padding:12px;border-radius:999px;border:none} .theme-toggle{width:40px;height:40px;border-radius:50%;border:1px solid #fff;background:transparent;color:#fff;cursor:pointer}
+.summary{margin-top:14px;display:flex;gap:10px;flex-wrap:wrap} .pill{background:rgba(255,255,255,.18);padding:6px 12px;border-radius:999px}
+.compose-group{background:var(--panel);border-radius:10px;margin-top:18px;overflow:hidden;border:1px solid var(--border)} .compose-header{background:#2c3e50;color:#fff;padding:12px 16px;display:flex;justify-content:space-between;cursor:pointer}
+.compose-body.expanded{padding:16px} .compose-body{max-height:0;overflow:hidden}
+.service-grid{display:grid;grid-template-columns:repeat(auto-fill,minmax(280px,1fr));gap:14px} .service-card{background:var(--card);padding:14px;border-radius:10px;border-left:4px solid #f1c40f}
+.service-card.running{border-left-color:#2ecc71} .service-card.stopped{border-left-color:#e74c3c}
+.service-header{display:flex;align-items:center;gap:10px;margin-bottom:10px} .status-indicator{width:10px;height:10px;border-radius:50%} .status-running{background:#2ecc71} .status-stopped{background:#e74c3c} .status-unknown{background:#f1c40f}
+.logo-container{width:34px;height:34px;border-radius:50%;display:flex;align-items:center;justify-content:center;background:#4b7bec;color:#fff;font-weight:700} .service-name{font-weight:600;display:flex;justify-content:space-between;gap:8px;flex:1}
+.service-status{font-size:.75em;padding:2px 8px;border-radius:999px} .status-badge-running{background:#d4edda;color:#155724} .status-badge-stopped{background:#f8d7da;color:#721c24} .status-badge-unknown{background:#fff3cd;color:#856404}
+.service-link{display:inline-flex;background:var(--link);color:#fff;padding:5px 10px;border-radius:999px;text-decoration:none;font-size:.82em} .service-link:hover{background:var(--linkh)} .service-links{display:flex;gap:8px;flex-wrap:wrap}
+.service-meta{margin-top:10px;display:flex;gap:10px;flex-wrap:wrap;font-size:.85em;color:var(--muted)} .hidden{display:none!important}
 </style></head><body><div class="container"><header><h1><i class="fas fa-network-wired"></i> Podman Compose Dashboard</h1><div>Overview of all compose stacks</div>
 <div class="controls"><input id="searchBox" class="search-box" placeholder="Search services or stack paths"><button id="themeToggle" class="theme-toggle"><i class="fas fa-moon"></i></button></div>
-<div class="summary"><span class="pill"><i class="fas fa-layer-group"></i> {len(compose_data)} stacks</span><span class="pill"><i class="fas fa-cubes"></i> {total_services} services</span><span class="pill"><i class="fas fa-play-circle"></i> {running_services} running</span><span class="pill"><i class="fas fa-clock"></i> {generation_time}</span></div></header>
-<main>{compose_sections}</main></div>
+<div class="summary"><span class="pill"><i class="fas fa-layer-group"></i> {{stack_count}} stacks</span><span class="pill"><i class="fas fa-cubes"></i> {{service_count}} services</span><span class="pill"><i class="fas fa-play-circle"></i> <span id="runningCount">{{running_count}}</span> running</span><span class="pill"><i class="fas fa-clock"></i> {{generated_at}}</span></div></header>
+<main>'''
+
+PAGE_SCRIPT = '''
 <script>
-const themeToggle=document.getElementById('themeToggle');const icon=themeToggle.querySelector('i');const savedTheme=localStorage.getItem('theme')||'dark';if(savedTheme==='dark'){{document.body.classList.add('dark-mode');icon.classList.replace('fa-moon','fa-sun')}}
-themeToggle.addEventListener('click',()=>{{document.body.classList.toggle('dark-mode');const dark=document.body.classList.contains('dark-mode');localStorage.setItem('theme',dark?'dark':'light');icon.classList.toggle('fa-sun',dark);icon.classList.toggle('fa-moon',!dark);}});
-document.querySelectorAll('.compose-header').forEach(h=>h.addEventListener('click',()=>{{const b=h.nextElementSibling;b.classList.toggle('expanded');h.querySelector('.expand-icon').textContent=b.classList.contains('expanded')?'−':'+';}}));
-document.getElementById('searchBox').addEventListener('input',function(){{const t=this.value.toLowerCase();document.querySelectorAll('.compose-group').forEach(g=>{{const p=(g.dataset.composePath||'');let m=p.includes(t);g.querySelectorAll('.service-card').forEach(c=>{{const ok=(c.dataset.serviceName||'').includes(t);c.classList.toggle('hidden',!ok&&!m);m=m||ok;}});g.classList.toggle('hidden',!m);}});}});
-</script></body></html>'''
+const themeToggle=document.getElementById('themeToggle');const icon=themeToggle.querySelector('i');const savedTheme=localStorage.getItem('theme')||'dark';if(savedTheme==='dark'){document.body.classList.add('dark-mode');icon.classList.replace('fa-moon','fa-sun')}
+themeToggle.addEventListener('click',()=>{document.body.classList.toggle('dark-mode');const dark=document.body.classList.contains('dark-mode');localStorage.setItem('theme',dark?'dark':'light');icon.classList.toggle('fa-sun',dark);icon.classList.toggle('fa-moon',!dark);});
+document.querySelectorAll('.compose-header').forEach(h=>h.addEventListener('click',()=>{const b=h.nextElementSibling;b.classList.toggle('expanded');h.querySelector('.expand-icon').textContent=b.classList.contains('expanded')?'−':'+';}));
+'''
+
+# Page behaviour when every card is in the DOM: search scans the cards, and
+# live status updates patch them in place.
+STATIC_RENDER_SCRIPT = '''document.getElementById('searchBox').addEventListener('input',function(){const t=this.value.toLowerCase();document.querySelectorAll('.compose-group').forEach(g=>{const p=(g.dataset.composePath||'');let m=p.includes(t);g.querySelectorAll('.service-card').forEach(c=>{const ok=(c.dataset.serviceName||'').includes(t);c.classList.toggle('hidden',!ok&&!m);m=m||ok;});g.classList.toggle('hidden',!m);});});
+if(window.EventSource){const cards=new Map();document.querySelectorAll('.service-card').forEach(c=>cards.set(c.dataset.composePath+'|'+c.dataset.serviceName,c));
+const patch=u=>{const c=cards.get(u.path.toLowerCase()+'|'+u.service.toLowerCase());if(!c)return;['running','stopped','unknown'].forEach(s=>c.classList.toggle(s,s===u.state));c.querySelector('.status-indicator').className='status-indicator status-'+u.state;const b=c.querySelector('.service-status');b.className='service-status status-badge-'+u.state;b.textContent=u.status;};
+const events=new EventSource('/events');const apply=e=>{JSON.parse(e.data).forEach(patch);document.getElementById('runningCount').textContent=document.querySelectorAll('.service-card.running').length;};
+events.addEventListener('snapshot',apply);events.addEventListener('status',apply);events.addEventListener('reload',()=>location.reload());}
+'''
+
+# Page behaviour for the "client" render mode: cards are built from the
+# embedded model when their group is expanded and near the viewport, search
+# runs against a lowercase index (debounced), and live status updates go to
+# the model first and to a card only if it has been built.
+CLIENT_RENDER_SCRIPT = '''const model=JSON.parse(document.getElementById('stackModel').textContent);
+const esc=v=>String(v).replace(/[&<>"]/g,c=>({'&':'&amp;','<':'&lt;','>':'&gt;','"':'&quot;'}[c]));
+const index=model.map(([p,svcs])=>({path:p.toLowerCase(),names:svcs.map(s=>s[0].toLowerCase())}));
+const where=new Map();model.forEach(([p,svcs],i)=>svcs.forEach((s,j)=>where.set(p.toLowerCase()+'|'+s[0].toLowerCase(),[i,j])));
+const cards=new Map();let term='';
+const link=u=>`<a href="${esc(u)}" target="_blank" class="service-link"><i class="fas fa-external-link-alt"></i> ${esc(u.replace(/^https?:\\/\\//,''))}</a>`;
+const cardHtml=(p,s)=>`<div class="service-card ${s[3]}" data-service-name="${esc(s[0].toLowerCase())}" data-compose-path="${esc(p.toLowerCase())}"><div class="service-header"><div class="status-indicator status-${s[3]}"></div><div class="logo-container">${esc(s[0].slice(0,1).toUpperCase()||'?')}</div><div class="service-name">${esc(s[0])}<span class="service-status status-badge-${s[3]}">${esc(s[2])}</span></div></div><div class="service-image">Image: <span class="detail-value">${esc(s[1])}</span></div><div class="service-links">${s[4].map(link).join('')||'<span class="no-links"><i class="fas fa-chain-broken"></i> No direct link</span>'}</div><div class="service-meta"><span><i class="fas fa-plug"></i> ${s[5]} ports</span><span><i class="fas fa-folder"></i> ${s[6]} volumes</span><span><i class="fas fa-leaf"></i> ${s[7]} env vars</span></div></div>`;
+const groups=[...document.querySelectorAll('.compose-group')];
+const filterGroup=g=>{const i=+g.dataset.stack,x=index[i],pm=x.path.includes(term);const ok=x.names.map(n=>pm||n.includes(term));g.classList.toggle('hidden',!pm&&!ok.some(Boolean));if(g.dataset.hydrated)ok.forEach((v,j)=>cards.get(i+'|'+j).classList.toggle('hidden',!v));};
+const hydrate=g=>{if(g.dataset.hydrated)return;const i=+g.dataset.stack,[p,svcs]=model[i],grid=g.querySelector('.service-grid');grid.innerHTML=svcs.map(s=>cardHtml(p,s)).join('')||'<div class="no-services">No services defined</div>';grid.style.minHeight='';grid.querySelectorAll('.service-card').forEach((c,j)=>cards.set(i+'|'+j,c));g.dataset.hydrated='1';filterGroup(g);};
+const expanded=g=>g.querySelector('.compose-body').classList.contains('expanded');
+const observer=new IntersectionObserver(es=>es.forEach(e=>{if(e.isIntersecting&&expanded(e.target)){hydrate(e.target);observer.unobserve(e.target);}}),{rootMargin:'600px'});
+groups.forEach(g=>{observer.observe(g);g.querySelector('.compose-header').addEventListener('click',()=>{if(expanded(g)){hydrate(g);observer.unobserve(g);}});});
+let searchTimer;document.getElementById('searchBox').addEventListener('input',function(){clearTimeout(searchTimer);const v=this.value.toLowerCase();searchTimer=setTimeout(()=>{term=v;groups.forEach(filterGroup);},150);});
+if(window.EventSource){const patch=u=>{const loc=where.get(u.path.toLowerCase()+'|'+u.service.toLowerCase());if(!loc)return;const s=model[loc[0]][1][loc[1]];s[2]=u.status;s[3]=u.state;const c=cards.get(loc.join('|'));if(!c)return;['running','stopped','unknown'].forEach(st=>c.classList.toggle(st,st===u.state));c.querySelector('.status-indicator').className='status-indicator status-'+u.state;const b=c.querySelector('.service-status');b.className='service-status status-badge-'+u.state;b.textContent=u.status;};
+const events=new EventSource('/events');const apply=e=>{JSON.parse(e.data).forEach(patch);document.getElementById('runningCount').textContent=model.reduce((n,[,svcs])=>n+svcs.filter(s=>s[3]==='running').length,0);};
+events.addEventListener('snapshot',apply);events.addEventListener('status',apply);events.addEventListener('reload',()=>location.reload());}
+'''
+
+PAGE_TEMPLATES = {
+    "static": PageTemplate(
+        PAGE_HEAD + "{{sections}}</main></div>" + PAGE_SCRIPT + STATIC_RENDER_SCRIPT + "</script></body></html>"
+    ),
+    "client": PageTemplate(
+        PAGE_HEAD + "{{sections}}</main></div>\n<script id=\"stackModel\" type=\"application/json\">{{model}}</script>"
+        + PAGE_SCRIPT + CLIENT_RENDER_SCRIPT + "</script></body></html>"
+    ),
+}
+
+
+def write_snapshot(body, output_file):
+    """Atomically replace output_file with body, so readers never see a partial page."""
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix=".index-")
+    try:
+        with os.fdopen(fd, "wb") as file_obj:
+            file_obj.write(body)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_file)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def generate_html(compose_data, output_file):
+    write_snapshot("".join(render_html(compose_data)).encode("utf-8"), output_file)
+
+
+def compress_variants(body, encodings):
+    """Return {content-coding: bytes} for the requested encodings that are available."""
+    encoded = {}
+    for encoding in encodings:
+        if encoding == "gzip":
+            encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        elif encoding == "br" and brotli is not None:
+            encoded["br"] = brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    # A variant that does not save anything is not worth serving
+    return {encoding: data for encoding, data in encoded.items() if len(data) < len(body)}
+
+
+def build_dashboard(data_dir=None, compose_index=None, encodings=(), status_source=None):
+    """Collect and render the dashboard in memory.
+
+    Returns a dict with the stacks ("compose_data"), the page as UTF-8 bytes
+    ("body"), its precompressed variants ("encoded"), "generated_at" and a
+    weak "etag" derived from the stacks, the render mode and the page
+    template, so pages that differ only in their generation time share a
+    validator.
+    """
+    try:
+        compose_data = collect_compose_data(data_dir, compose_index, status_source)
+        render_mode = resolve_render_mode(compose_data)
+        with phase_timer("render"):
+            body = "".join(render_html(compose_data, render_mode)).encode("utf-8")
+        with phase_timer("compress"):
+            encoded = compress_variants(body, encodings)
+    except Exception:
+        METRICS.inc("dashboard_generations_total", result="error")
+        raise
+    generated_at = time.time()
+    METRICS.inc("dashboard_generations_total", result="ok")
+    METRICS.set("dashboard_last_generation_timestamp_seconds", generated_at)
+    return {
+        "compose_data": compose_data,
+        "body": body,
+        "encoded": encoded,
+        "generated_at": generated_at,
+        "etag": model_etag(compose_data, render_mode),
+    }
 
-    with open(output_file, "w", encoding="utf-8") as file_obj:
-        file_obj.write(html)
 
+def model_etag(compose_data, render_mode):
+    digest = hashlib.sha256(f"{render_mode} {PAGE_TEMPLATES[render_mode].digest} ".encode("utf-8"))
+    digest.update(json.dumps(compose_data, sort_keys=True, default=str).encode("utf-8"))
+    return f'W/"{digest.hexdigest()[:32]}"'
 
-def main(data_dir=None):
+
+def collect_compose_data(data_dir=None, compose_index=None, status_source=None):
+    """Return the parsed stacks with their current status, in discovery order.
+
+    status_source, when given, provides the status snapshot (see
+    podman_events.PodmanEventTracker) instead of asking podman again; while
+    it has no state a single `podman ps` snapshot is taken instead.
+    """
     dashboard_dir = Path(__file__).parent
     root_dir = Path(data_dir) if data_dir else dashboard_dir.parent
-    compose_files = find_compose_files(root_dir)
-    compose_data = [item for item in (parse_compose_file(path) for path in compose_files) if item]
+    with phase_timer("discover"):
+        if compose_index is not None:
+            compose_files = compose_index.files()
+        else:
+            compose_files = find_compose_files(root_dir)
+    with phase_timer("status"):
+        snapshot = status_source.snapshot() if status_source is not None else None
+        if snapshot is None and STATUS_MODE in ("snapshot", "events"):
+            # Until the tracker is seeded one `podman ps` still beats a
+            # `podman compose ps` per stack
+            if status_source is not None:
+                METRICS.inc("dashboard_status_fallbacks_total", to="ps")
+            snapshot = get_status_snapshot()
+    if snapshot is None and STATUS_MODE in ("snapshot", "events"):
+        METRICS.inc("dashboard_status_fallbacks_total", to="compose-ps")
+    parse_cache = get_parse_cache()
+    METRICS.clear("dashboard_stack_seconds")
+    # Without a snapshot each stack blocks on its own podman call, so parse
+    # them concurrently; map() keeps the results in compose_files order.
+    with phase_timer("parse"):
+        with ThreadPoolExecutor(max_workers=max(1, STATUS_WORKERS)) as executor:
+            parse = partial(timed_parse_compose_file, root_dir=root_dir, snapshot=snapshot, parse_cache=parse_cache)
+            compose_data = [item for item in executor.map(parse, compose_files) if item]
+        parse_cache.save()
+    METRICS.set("dashboard_stacks", len(compose_data))
+    METRICS.set("dashboard_services", sum(len(compose["services"]) for compose in compose_data))
+    return compose_data
+
+
+def phase_timer(phase):
+    return METRICS.timer("dashboard_phase_seconds", last="dashboard_phase_last_seconds", phase=phase)
+
+
+def timed_parse_compose_file(file_path, root_dir, snapshot=None, parse_cache=None):
+    """parse_compose_file, recording the time spent on the stack."""
+    started = time.perf_counter()
+    try:
+        return parse_compose_file(file_path, snapshot=snapshot, parse_cache=parse_cache)
+    finally:
+        stack = os.path.relpath(os.path.dirname(file_path), root_dir)
+        METRICS.set("dashboard_stack_seconds", time.perf_counter() - started, stack=stack)
+
+
+def main(data_dir=None, compose_index=None):
+    dashboard_dir = Path(__file__).parent
+    dashboard = build_dashboard(data_dir, compose_index)
     output_file = os.path.join(dashboard_dir, "index.html")
-    generate_html(compose_data, output_file)
+    write_snapshot(dashboard["body"], output_file)
     print(f"Dashboard generated at {output_file}")
+    return output_file
 
 
 if __name__ == "__main__":
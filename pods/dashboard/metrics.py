@@ -0,0 +1,99 @@
+"""
+Minimal Prometheus-style metrics registry for the dashboard.
+
+Only what the dashboard needs: counters, gauges and phase timers, rendered in
+the Prometheus text exposition format for /metrics. Kept dependency-free so
+generate_dashboard.py still runs as a plain script.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._values = {}
+
+    def describe(self, name, metric_type, help_text):
+        with self._lock:
+            self._types[name] = metric_type
+            self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self, name):
+        """Drop every series of a metric, e.g. per-stack gauges before a new generation."""
+        with self._lock:
+            for key in [key for key in self._values if key[0] == name]:
+                del self._values[key]
+
+    def observe(self, name, seconds, last=None, **labels):
+        """Record a duration in a summary (_sum/_count) and optionally a last-value gauge."""
+        self.inc(f"{name}_sum", seconds, **labels)
+        self.inc(f"{name}_count", 1, **labels)
+        if last is not None:
+            self.set(last, seconds, **labels)
+
+    @contextmanager
+    def timer(self, name, last=None, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, last, **labels)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            values = sorted(self._values.items())
+            types = dict(self._types)
+            help_texts = dict(self._help)
+
+        lines = []
+        described = set()
+        for (name, labels), value in values:
+            family = name
+            for suffix in ("_sum", "_count"):
+                if name.endswith(suffix) and name[:-len(suffix)] in types:
+                    family = name[:-len(suffix)]
+                    break
+            if family not in described and family in types:
+                described.add(family)
+                lines.append(f"# HELP {family} {help_texts[family]}")
+                lines.append(f"# TYPE {family} {types[family]}")
+            label_text = ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+            series = f"{name}{{{label_text}}}" if label_text else name
+            lines.append(f"{series} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+METRICS = Metrics()
+METRICS.describe("dashboard_phase_seconds", "summary", "Time spent in each dashboard generation phase.")
+METRICS.describe("dashboard_phase_last_seconds", "gauge", "Time spent in each phase of the last generation.")
+METRICS.describe("dashboard_stack_seconds", "gauge", "Time spent parsing and collecting status per stack in the last generation.")
+METRICS.describe("dashboard_generations_total", "counter", "Dashboard generations by result.")
+METRICS.describe("dashboard_last_generation_timestamp_seconds", "gauge", "Unix time of the last successful generation.")
+METRICS.describe("dashboard_stacks", "gauge", "Stacks in the last generation.")
+METRICS.describe("dashboard_services", "gauge", "Services in the last generation.")
+METRICS.describe("dashboard_parse_cache_total", "counter", "Compose parse cache lookups by result.")
+METRICS.describe("dashboard_subprocess_failures_total", "counter", "Failed podman invocations by command and reason.")
+METRICS.describe("dashboard_status_fallbacks_total", "counter", "Status collections that fell back to a slower path.")
+METRICS.describe("dashboard_status_events_total", "counter", "podman events applied to the in-memory status map.")
+METRICS.describe("dashboard_http_responses_total", "counter", "HTTP responses by route and status code.")
+METRICS.describe("dashboard_sse_subscribers", "gauge", "Open /events streams.")
@@ -0,0 +1,199 @@
+"""
+Container status kept current from `podman events`.
+
+PodmanEventTracker seeds its state from one `podman ps` and then follows the
+event stream, so collecting status for a dashboard generation is a dictionary
+copy instead of a subprocess. A seed that fails is retried with backoff, and
+the state is seeded again once the first event shows the stream is live. If
+the stream ends it is restarted and the state re-seeded, since events may
+have been missed in between.
+
+    python3 podman_events.py testdata/podman-events.jsonl
+
+replays a recorded stream on top of an empty seed and prints the snapshot.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+
+from generate_dashboard import compose_container, index_statuses, list_compose_containers
+from metrics import METRICS
+
+EVENTS_COMMAND = ["podman", "events", "--format", "json", "--filter", "type=container"]
+# Seconds to wait before restarting a stream that ended, doubling up to the max.
+RESTART_DELAY = 1.0
+RESTART_DELAY_MAX = 60.0
+
+# Event status -> container state as `podman ps` would report it.
+EVENT_STATES = {
+    "create": "created",
+    "init": "initialized",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "stop": "exited",
+    "died": "exited",
+}
+
+
+class PodmanEventTracker:
+    """In-memory {container id: (project, service, state)} following podman events."""
+
+    def __init__(self, command=None):
+        self.command = list(command or EVENTS_COMMAND)
+        # Called with no arguments after every change in container state
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._containers = None
+        self._process = None
+        self._seeded = threading.Event()
+        self._stop = threading.Event()
+
+    def snapshot(self):
+        """Return {project: {service: state}}, or None until the state is seeded."""
+        with self._lock:
+            if self._containers is None:
+                return None
+            return index_statuses(self._containers)
+
+    def seed(self, containers=None):
+        """Replace the state with one `podman ps` (or containers); False if podman failed."""
+        if containers is None:
+            containers = list_compose_containers()
+        if containers is None:
+            return False
+        with self._lock:
+            self._containers = dict(containers)
+        self._seeded.set()
+        self._notify()
+        return True
+
+    def wait_seeded(self, timeout=None):
+        """Block until the first successful seed; returns False on timeout."""
+        return self._seeded.wait(timeout)
+
+    def apply(self, event):
+        """Apply one decoded event; returns True if a container's state changed."""
+        if not isinstance(event, dict) or event.get("Type", "container") != "container":
+            return False
+        container_id = event.get("ID") or event.get("Id")
+        status = event.get("Status")
+        if not container_id or not status:
+            return False
+
+        with self._lock:
+            if self._containers is None:
+                return False
+            if status == "remove":
+                return self._containers.pop(container_id, None) is not None
+
+            state = EVENT_STATES.get(status)
+            if state is None:
+                return False
+            known = self._containers.get(container_id)
+            if known is None:
+                identity = compose_container(event.get("Attributes"), event.get("Name") or "")
+                if identity is None:
+                    return False
+            else:
+                identity = known[:2]
+            if known is not None and known[2] == state:
+                return False
+            self._containers[container_id] = (*identity, state)
+            return True
+
+    def follow(self, stream, reseed=False):
+        """Apply newline-delimited JSON events from stream until it ends.
+
+        With reseed, the state is seeded again when the first event arrives
+        instead of applying it: by then podman is certainly subscribed, so the
+        new seed covers everything that happened before the stream went live.
+        """
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if reseed:
+                reseed = False
+                if self.seed():
+                    continue
+            if self.apply(event):
+                METRICS.inc("dashboard_status_events_total")
+                self._notify()
+
+    def _notify(self):
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as exc:
+                print(f"Error notifying status listener: {exc}")
+
+    def run(self):
+        delay = RESTART_DELAY
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                # Start listening before seeding so events during the seed are
+                # replayed on top of it; Popen returning does not mean podman
+                # has subscribed yet, which the re-seed in follow() covers
+                self._process = subprocess.Popen(
+                    self.command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+                )
+            except FileNotFoundError:
+                METRICS.inc("dashboard_subprocess_failures_total", command="podman events", reason="missing")
+                print(f"{self.command[0]} not found; container status events unavailable")
+                return
+            if not self.seed_with_retry():
+                return
+            self.follow(self._process.stdout, reseed=True)
+            self._process.wait()
+            if self._stop.is_set():
+                return
+
+            METRICS.inc("dashboard_subprocess_failures_total", command="podman events", reason="exit")
+            print(f"{' '.join(self.command)} exited ({self._process.returncode}), restarting")
+            if time.monotonic() - started > RESTART_DELAY_MAX:
+                delay = RESTART_DELAY
+            self._stop.wait(delay)
+            delay = min(delay * 2, RESTART_DELAY_MAX)
+
+    def seed_with_retry(self):
+        """Seed, retrying with backoff while podman fails; False once stopped."""
+        delay = RESTART_DELAY
+        while not self.seed():
+            print(f"Seeding container status failed, retrying in {delay:g}s")
+            if self._stop.wait(delay):
+                return False
+            delay = min(delay * 2, RESTART_DELAY_MAX)
+        return True
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="podman-events", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+
+def replay(path):
+    """Apply a recorded event stream to an empty seed and return the snapshot."""
+    tracker = PodmanEventTracker()
+    tracker.seed({})
+    with open(path) as stream:
+        tracker.follow(stream)
+    return tracker.snapshot()
+
+
+if __name__ == "__main__":
+    print(json.dumps(replay(sys.argv[1]), indent=2, sort_keys=True))
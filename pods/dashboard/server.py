@@ -1,63 +1,347 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server that serves the dashboard and regenerates it on each request
+Simple HTTP server that serves the dashboard from an in-memory cache.
+
+The rendered page is kept in memory and regenerated in the background every
+DASHBOARD_TTL seconds, so requests never wait for a full regeneration unless
+no page has been rendered yet. Set DASHBOARD_SNAPSHOT to a path to also keep
+an on-disk copy of the page, replaced atomically after each regeneration.
+Generation timings and status counters are exported for Prometheus at /metrics.
 """
 
+import email.utils
 import http.server
-import socketserver
+import json
 import os
-from pathlib import Path
+import queue
 import threading
 import time
-from generate_dashboard import main as generate_dashboard
+from urllib.parse import urlsplit, parse_qs, unquote
+from generate_dashboard import STATUS_MODE, STATUS_TIMEOUT, build_dashboard, compress_variants, write_snapshot
+from api import api_etag, render_stacks
+from events import StatusBroadcaster
+from podman_events import PodmanEventTracker
+from compose_index import ComposeIndex, DISCOVERY_MODE
+from metrics import METRICS
+
+DEFAULT_TTL = 30
+# Idle keep-alive connections are closed after this many seconds.
+KEEPALIVE_TIMEOUT = 15
+# Content-codings produced once per regeneration, in order of preference
+# ("br" needs the brotli module and is skipped without it).
+DEFAULT_ENCODINGS = "br,gzip"
+# Rendered /api views are memoized per dashboard generation, up to this many.
+API_VIEW_LIMIT = 64
+# An SSE comment is sent this often so dead /events clients are noticed.
+EVENTS_HEARTBEAT = 15
+# Seconds to wait after an invalidation before regenerating.
+INVALIDATE_DELAY = 0.2
+# Fixed route labels for dashboard_http_responses_total, so arbitrary request
+# paths cannot grow the number of series.
+METRIC_ROUTES = ('/', '/index.html', '/api/stacks', '/events', '/health', '/metrics')
+
+
+class DashboardCache:
+    """Holds the last rendered dashboard and refreshes it at most once at a time."""
+
+    def __init__(self, data_dir, ttl=DEFAULT_TTL, compose_index=None, snapshot_path=None, encodings=(),
+                 status_source=None):
+        self.data_dir = data_dir
+        self.ttl = ttl
+        self.compose_index = compose_index
+        self.status_source = status_source
+        self.snapshot_path = snapshot_path
+        self.encodings = tuple(encodings)
+        # Called with each new dashboard after a successful refresh
+        self.listeners = []
+        self._cond = threading.Condition()
+        self._dashboard = None
+        self._generated_at = 0.0
+        self._refreshing = False
+        self._generation = 0
+        self._invalidated = threading.Event()
+
+    def get(self):
+        """Return the cached dashboard (see build_dashboard), rendering it first if needed."""
+        with self._cond:
+            dashboard = self._dashboard
+        if dashboard is None:
+            self.refresh()
+            with self._cond:
+                dashboard = self._dashboard
+        return dashboard
+
+    def age(self):
+        """Seconds since the cached dashboard was generated (infinite if there is none)."""
+        with self._cond:
+            if self._dashboard is None:
+                return float('inf')
+            return time.monotonic() - self._generated_at
+
+    def is_stale(self):
+        return self._invalidated.is_set() or self.age() >= self.ttl
+
+    def invalidate(self):
+        """Ask the refresh thread to regenerate soon, e.g. after a status change."""
+        self._invalidated.set()
+
+    def refresh(self):
+        """Regenerate the page; callers arriving mid-refresh wait for that one instead."""
+        with self._cond:
+            if self._refreshing:
+                generation = self._generation
+                while self._refreshing and self._generation == generation:
+                    self._cond.wait()
+                return
+            self._refreshing = True
+            self._invalidated.clear()
+
+        dashboard = None
+        try:
+            print("Regenerating dashboard...")
+            dashboard = build_dashboard(self.data_dir, self.compose_index, self.encodings, self.status_source)
+            if self.snapshot_path:
+                write_snapshot(dashboard["body"], self.snapshot_path)
+            print("Dashboard regenerated successfully")
+        except Exception as e:
+            print(f"Error regenerating dashboard: {e}")
+        finally:
+            with self._cond:
+                if dashboard is not None:
+                    # Last-Modified only moves when the content does
+                    previous = self._dashboard
+                    if previous is not None and previous["etag"] == dashboard["etag"]:
+                        dashboard["last_modified"] = previous["last_modified"]
+                    else:
+                        dashboard["last_modified"] = dashboard["generated_at"]
+                    self._dashboard = dashboard
+                    self._generated_at = time.monotonic()
+                self._refreshing = False
+                self._generation += 1
+                self._cond.notify_all()
+
+        if dashboard is not None:
+            for listener in self.listeners:
+                try:
+                    listener(dashboard)
+                except Exception as e:
+                    print(f"Error notifying dashboard listener: {e}")
+
+    def start(self):
+        """Keep the cache warm from a daemon thread."""
+        def loop():
+            while True:
+                if self.is_stale():
+                    self.refresh()
+                if self._invalidated.wait(max(1.0, self.ttl / 4)):
+                    # Let a burst of changes (compose up/down) settle first
+                    time.sleep(INVALIDATE_DELAY)
+
+        thread = threading.Thread(target=loop, name="dashboard-refresh", daemon=True)
+        thread.start()
+        return thread
+
 
 class DashboardHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 for keep-alive and chunked responses; every response carries
+    # a Content-Length or is chunked so the connection can be reused.
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    cache = None
+    broadcaster = None
+
     def do_GET(self):
-        if self.path == '/' or self.path == '/index.html':
-            # Regenerate the dashboard before serving
-            print("Regenerating dashboard...")
-            try:
-                # Pass the data directory to the generator
-                data_dir = os.environ.get('DATA_DIR', '/app/data')
-                generate_dashboard(data_dir)
-                print("Dashboard regenerated successfully")
-            except Exception as e:
-                print(f"Error regenerating dashboard: {e}")
+        url = urlsplit(self.path)
+        if url.path == '/' or url.path == '/index.html':
+            if parse_qs(url.query).get('fresh') == ['1']:
+                # Regenerate first; concurrent fresh requests share one
+                # generation with each other and the refresh thread
+                self.cache.refresh()
+            dashboard = self.cache.get()
+            if dashboard is None:
                 # Return an error page if generation fails
-                self.send_response(500)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(b"<h1>500 - Error generating dashboard</h1>")
+                self.send_error_page(500, b"<h1>500 - Error generating dashboard</h1>")
                 return
 
-            # Serve the index.html file directly
+            self.send_cached(dashboard, dashboard["body"], 'text/html', dashboard["encoded"])
+            return
+        elif url.path == '/api/stacks' or url.path.startswith('/api/stacks/'):
+            dashboard = self.cache.get()
+            if dashboard is None:
+                self.send_json_error(500, "Error generating dashboard")
+                return
+
+            view = self.api_view(dashboard, url)
+            if view is None:
+                self.send_json_error(404, "Stack not found")
+                return
+            body, encoded, etag = view
+            self.send_cached(dashboard, body, 'application/json', encoded, etag)
+            return
+        elif url.path == '/events':
+            self.send_events()
+            return
+        elif url.path == '/metrics':
+            body = METRICS.render().encode('utf-8')
             self.send_response(200)
-            self.send_header('Content-type', 'text/html')
+            self.send_header('Content-type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
             self.end_headers()
-
-            # Read and send the index.html file
-            try:
-                with open('/app/index.html', 'rb') as file:
-                    self.wfile.write(file.read())
-            except FileNotFoundError:
-                self.send_response(404)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(b"<h1>404 - Dashboard file not found</h1>")
+            self.wfile.write(body)
             return
-        elif self.path == '/health':
-            # Health check endpoint
+        elif url.path == '/health':
+            # Health check endpoint; never touches the cache so it answers
+            # immediately even while a regeneration is running
             self.send_response(200)
             self.send_header('Content-type', 'text/plain')
+            self.send_header('Content-Length', '2')
             self.end_headers()
             self.wfile.write(b"OK")
             return
         else:
             # Handle other requests (like favicon, etc.)
-            self.send_response(404)
-            self.send_header('Content-type', 'text/html')
+            self.send_error_page(404, b"<h1>404 - Page not found</h1>")
+
+    def api_view(self, dashboard, url):
+        """Return (body, encoded, etag) for an /api/stacks URL, or None for an unknown stack."""
+        key = f"{url.path}?{url.query}"
+        views = dashboard.setdefault("api", {})
+        view = views.get(key)
+        if view is None:
+            path = unquote(url.path[len('/api/stacks/'):]) if url.path.startswith('/api/stacks/') else None
+            body = render_stacks(dashboard, path, parse_qs(url.query))
+            if body is None:
+                return None
+            view = (body, compress_variants(body, self.cache.encodings), api_etag(dashboard, key))
+            if len(views) >= API_VIEW_LIMIT:
+                views.clear()
+            views[key] = view
+        return view
+
+    def send_events(self):
+        """Stream status changes as Server-Sent Events until the client goes away."""
+        subscriber, initial = self.broadcaster.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            # The stream has no length, so it ends with the connection
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+            self.end_headers()
+            self.wfile.write(b"retry: 5000\n\n" + initial)
+            while self.broadcaster.is_subscribed(subscriber):
+                try:
+                    message = subscriber.get(timeout=EVENTS_HEARTBEAT)
+                except queue.Empty:
+                    message = b": ping\n\n"
+                self.wfile.write(message)
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            pass
+        finally:
+            self.broadcaster.unsubscribe(subscriber)
+
+    def send_json_error(self, code, message):
+        body = json.dumps({"error": message}).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def is_not_modified(self, etag, last_modified):
+        """Evaluate If-None-Match / If-Modified-Since against a cached response."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # Weak comparison, as required for GET
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag.removeprefix('W/') in tags
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(last_modified) <= since
+        return False
+
+    def accepted_encoding(self, available):
+        """Pick the preferred coding in available that Accept-Encoding allows, or None."""
+        header = self.headers.get('Accept-Encoding')
+        if not header or not available:
+            return None
+
+        qualities = {}
+        for item in header.split(','):
+            coding, _, params = item.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            qualities[coding.strip().lower()] = quality
+
+        best = None
+        for coding in available:
+            quality = qualities.get(coding, qualities.get('*', 0.0))
+            if quality > 0 and (best is None or quality > best[1]):
+                best = (coding, quality)
+        return best[0] if best else None
+
+    def send_cached(self, dashboard, body, content_type, encoded=None, etag=None):
+        """Send body with the dashboard's validators, or 304 if the client has it.
+
+        encoded maps content-codings to precompressed copies of body; the one
+        the client prefers is sent instead of body. etag overrides the page's
+        ETag for other views of the same dashboard.
+        """
+        etag = etag or dashboard["etag"]
+        last_modified = dashboard["last_modified"]
+        if self.is_not_modified(etag, last_modified):
+            self.send_response(304)
+            self.send_validators(etag, last_modified, vary=encoded is not None)
             self.end_headers()
-            self.wfile.write(b"<h1>404 - Page not found</h1>")
+            return
+
+        coding = self.accepted_encoding(encoded)
+        if coding is not None:
+            body = encoded[coding]
+
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        if coding is not None:
+            self.send_header('Content-Encoding', coding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_validators(etag, last_modified, vary=encoded is not None)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_validators(self, etag, last_modified, vary=False):
+        if vary:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(last_modified, usegmt=True))
+        # Always revalidate; a 304 costs almost nothing
+        self.send_header('Cache-Control', 'no-cache')
+
+    def send_error_page(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_response(self, code, message=None):
+        # Malformed requests are answered by send_error before self.path is set
+        path = urlsplit(getattr(self, 'path', None) or '').path
+        if path.startswith('/api/stacks/'):
+            path = '/api/stacks'
+        route = path if path in METRIC_ROUTES else 'other'
+        METRICS.inc("dashboard_http_responses_total", route=route, code=str(code))
+        super().send_response(code, message)
 
     def end_headers(self):
         # Add security headers
@@ -69,18 +353,51 @@ class DashboardHandler(http.server.BaseHTTPRequestHandler):
 
 def main():
     PORT = int(os.environ.get('PORT', 8000))
+    data_dir = os.environ.get('DATA_DIR', '/app/data')
+    ttl = float(os.environ.get('DASHBOARD_TTL', DEFAULT_TTL))
+
+    # Index compose files once and keep the index current from a watcher,
+    # unless DASHBOARD_DISCOVERY=walk asks for a full walk per generation
+    compose_index = None
+    if DISCOVERY_MODE != "walk":
+        compose_index = ComposeIndex(data_dir).start()
+
+    # Follow podman events instead of asking podman for every generation
+    status_source = None
+    if STATUS_MODE == "events":
+        status_source = PodmanEventTracker()
+
+    encodings = [e.strip() for e in os.environ.get('DASHBOARD_ENCODINGS', DEFAULT_ENCODINGS).split(',') if e.strip()]
+    cache = DashboardCache(data_dir, ttl, compose_index, os.environ.get('DASHBOARD_SNAPSHOT'), encodings,
+                           status_source)
+    if status_source is not None:
+        status_source.listeners.append(cache.invalidate)
+        status_source.start()
+        # Let the tracker seed before the first generation, so it does not
+        # have to take its own snapshot
+        if not status_source.wait_seeded(STATUS_TIMEOUT):
+            print(f"Container status not seeded after {STATUS_TIMEOUT:g}s, starting without it")
+    broadcaster = StatusBroadcaster(cache)
+    cache.listeners.append(broadcaster.publish)
 
     # Initial generation of dashboard
     print("Generating initial dashboard...")
-    data_dir = os.environ.get('DATA_DIR', '/app/data')
-    generate_dashboard(data_dir)
+    cache.refresh()
+    cache.start()
+    broadcaster.start()
 
     # Start the server
     handler = DashboardHandler
-    with socketserver.TCPServer(("", PORT), handler) as httpd:
+    handler.cache = cache
+    handler.broadcaster = broadcaster
+    handler.timeout = float(os.environ.get('DASHBOARD_KEEPALIVE_TIMEOUT', KEEPALIVE_TIMEOUT))
+    # One thread per connection, so /health and cached pages are never queued
+    # behind a slow client or a request waiting for the first generation
+    with http.server.ThreadingHTTPServer(("", PORT), handler) as httpd:
+        httpd.daemon_threads = True
         print(f"Server running at http://0.0.0.0:{PORT}/")
         httpd.serve_forever()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,60 @@
+"""
+Replays testdata/podman-events.jsonl through PodmanEventTracker.
+
+    python3 -m unittest test_podman_events
+"""
+
+import io
+import os
+import unittest
+from unittest import mock
+
+from podman_events import PodmanEventTracker, replay
+
+EVENTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "podman-events.jsonl")
+
+
+class PodmanEventTrackerTest(unittest.TestCase):
+    def test_replay(self):
+        self.assertEqual(replay(EVENTS), {
+            "app1": {"web": "running", "db": "exited"},
+            "app2": {"worker": "paused", "cron": "running"},
+        })
+
+    def test_unseeded_ignores_events(self):
+        tracker = PodmanEventTracker()
+        with open(EVENTS) as stream:
+            tracker.follow(stream)
+        self.assertIsNone(tracker.snapshot())
+
+    def test_failed_seed_keeps_state(self):
+        tracker = PodmanEventTracker()
+        tracker.seed({"a1": ("app1", "web", "running")})
+        with mock.patch("podman_events.list_compose_containers", return_value=None):
+            self.assertFalse(tracker.seed())
+        self.assertEqual(tracker.snapshot(), {"app1": {"web": "running"}})
+
+    def test_first_event_reseeds(self):
+        tracker = PodmanEventTracker()
+        tracker.seed({})
+        seeded = {"a1": ("app1", "web", "exited"), "a2": ("app1", "db", "running")}
+        stream = io.StringIO(
+            '{"ID":"a1","Status":"stop","Type":"container"}\n'
+            '{"ID":"a2","Status":"died","Type":"container"}\n'
+        )
+        with mock.patch("podman_events.list_compose_containers", return_value=seeded):
+            tracker.follow(stream, reseed=True)
+        self.assertEqual(tracker.snapshot(), {"app1": {"web": "exited", "db": "exited"}})
+
+    def test_seed_retries_until_podman_answers(self):
+        tracker = PodmanEventTracker()
+        answers = [None, None, {"a1": ("app1", "web", "running")}]
+        with mock.patch("podman_events.list_compose_containers", side_effect=answers), \
+                mock.patch.object(tracker._stop, "wait", return_value=False) as wait:
+            self.assertTrue(tracker.seed_with_retry())
+        self.assertEqual([call.args[0] for call in wait.call_args_list], [1.0, 2.0])
+        self.assertTrue(tracker.wait_seeded(0))
+
+
+if __name__ == "__main__":
+    unittest.main()
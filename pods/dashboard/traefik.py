@@ -0,0 +1,212 @@
+"""
+URLs a compose service is reachable at, derived from its Traefik labels.
+
+Router rules are parsed into the (host, path) pairs they can match:
+Host/HostRegexp/Path/PathPrefix matchers combined with ||, && and
+parentheses. The scheme comes from the router's TLS setting and its
+entrypoints (see DASHBOARD_ENTRYPOINTS). Parsed rules are memoized by rule
+text, so the same labels seen again cost one dictionary lookup.
+"""
+
+import os
+import re
+from functools import lru_cache
+
+ROUTER_PREFIX = "traefik.http.routers."
+# Entrypoint name -> "scheme" or "scheme:port", for entrypoints whose URL is
+# not plain http on port 80. Comma separated, e.g. "websecure=https,alt=http:8080".
+DEFAULT_ENTRYPOINTS = "web=http,websecure=https"
+# A pathological rule is cut off after this many alternatives.
+MAX_ALTERNATIVES = 64
+
+TOKEN = re.compile(
+    r"""\s*(?:(?P<op>\|\||&&|!|\(|\))|(?P<matcher>\w+)\((?P<args>(?:`[^`]*`|"[^"]*"|'[^']*'|[^()`"'])*)\))"""
+)
+ARGUMENT = re.compile(r"""`([^`]*)`|"([^"]*)"|'([^']*)'""")
+REGEXP_SPECIAL = re.compile(r"[\[\](){}*+?|^$\\]")
+# The alternative a matcher that does not restrict host or path contributes.
+ANY = (None, None)
+
+
+def parse_entrypoints(value):
+    entrypoints = {}
+    for item in value.split(","):
+        name, _, target = item.strip().partition("=")
+        if not name or not target:
+            continue
+        scheme, _, port = target.partition(":")
+        entrypoints[name] = (scheme, port or None)
+    return entrypoints
+
+
+ENTRYPOINTS = parse_entrypoints(os.environ.get("DASHBOARD_ENTRYPOINTS", DEFAULT_ENTRYPOINTS))
+
+
+def literal_host(pattern):
+    """Return the host a HostRegexp pattern matches, if it matches only one."""
+    pattern = pattern.removeprefix("^").removesuffix("$").replace("\\.", ".")
+    return None if REGEXP_SPECIAL.search(pattern) else pattern
+
+
+def combine(left, right):
+    """&& of two alternatives; None when they cannot both match."""
+    host = left[0] or right[0]
+    if left[0] and right[0] and left[0] != right[0]:
+        return None
+    paths = sorted(filter(None, (left[1], right[1])), key=len)
+    if len(paths) == 2 and not paths[1].startswith(paths[0]):
+        return None
+    return host, paths[-1] if paths else None
+
+
+class RuleParser:
+    """Recursive descent over a router rule: or := and ('||' and)*, and := not ('&&' not)*."""
+
+    def __init__(self, rule):
+        self.tokens = []
+        position = 0
+        rule = rule.strip()
+        while position < len(rule):
+            match = TOKEN.match(rule, position)
+            if match is None or match.end() == position:
+                raise ValueError(f"unexpected text at {position}: {rule[position:position + 20]!r}")
+            self.tokens.append(match)
+            position = match.end()
+            while position < len(rule) and rule[position].isspace():
+                position += 1
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]["op"]
+        return None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self):
+        alternatives = self.parse_or()
+        if self.position != len(self.tokens):
+            raise ValueError("unbalanced parentheses")
+        return alternatives
+
+    def parse_or(self):
+        alternatives = self.parse_and()
+        while self.peek() == "||":
+            self.take()
+            alternatives = alternatives + self.parse_and()
+        return alternatives[:MAX_ALTERNATIVES]
+
+    def parse_and(self):
+        alternatives = self.parse_not()
+        while self.peek() == "&&":
+            self.take()
+            right = self.parse_not()
+            alternatives = [
+                combined
+                for left in alternatives
+                for other in right
+                if (combined := combine(left, other)) is not None
+            ][:MAX_ALTERNATIVES]
+        return alternatives
+
+    def parse_not(self):
+        if self.position >= len(self.tokens):
+            raise ValueError("rule ends early")
+        token = self.take()
+        if token["op"] == "!":
+            # A negation narrows the match but never names a host or path
+            self.parse_not()
+            return [ANY]
+        if token["op"] == "(":
+            alternatives = self.parse_or()
+            if self.peek() != ")":
+                raise ValueError("missing )")
+            self.take()
+            return alternatives
+        if token["op"]:
+            raise ValueError(f"unexpected {token['op']}")
+        return self.matcher(token["matcher"], [
+            next(group for group in argument.groups() if group is not None)
+            for argument in ARGUMENT.finditer(token["args"])
+        ])
+
+    @staticmethod
+    def matcher(name, arguments):
+        if name == "Host":
+            return [(host.lower(), None) for host in arguments]
+        if name == "HostRegexp":
+            hosts = [literal_host(pattern) for pattern in arguments]
+            return [(host.lower(), None) for host in hosts if host]
+        if name in ("Path", "PathPrefix"):
+            # Traefik v2 path placeholders ({id:[0-9]+}) end the usable prefix
+            return [(None, path.split("{", 1)[0] or "/") for path in arguments]
+        return [ANY]
+
+
+@lru_cache(maxsize=1024)
+def parse_rule(rule):
+    """Return the (host, path) pairs a router rule matches; path may be None.
+
+    Alternatives that match any host are dropped, as no URL can be built for
+    them. Rules that cannot be parsed yield nothing.
+    """
+    try:
+        alternatives = RuleParser(rule).parse()
+    except ValueError:
+        return ()
+    return tuple(dict.fromkeys(alternative for alternative in alternatives if alternative[0]))
+
+
+def router_labels(labels):
+    """Group traefik.http.routers.<name>.<option> labels as {name: {option: value}}."""
+    if isinstance(labels, dict):
+        items = labels.items()
+    else:
+        items = (str(label).partition("=")[::2] for label in labels or [])
+
+    routers = {}
+    enabled = True
+    for key, value in items:
+        key = str(key).strip()
+        if key == "traefik.enable":
+            enabled = str(value).strip().lower() != "false"
+        elif key.startswith(ROUTER_PREFIX):
+            name, _, option = key[len(ROUTER_PREFIX):].partition(".")
+            if name and option:
+                routers.setdefault(name, {})[option] = str(value).strip()
+    return routers if enabled else {}
+
+
+def router_schemes(options):
+    """Return the (scheme, port) pairs a router is served on."""
+    tls = options.get("tls", "").lower() == "true" or any(
+        option.startswith("tls.") for option in options
+    )
+    if options.get("tls", "").lower() == "false":
+        tls = False
+    entrypoints = [name.strip() for name in options.get("entrypoints", "").split(",") if name.strip()]
+
+    schemes = []
+    for name in entrypoints or [None]:
+        scheme, port = ENTRYPOINTS.get(name, ("http", None))
+        if tls and scheme == "http":
+            scheme = "https"
+        schemes.append((scheme, port))
+    return schemes
+
+
+def service_urls(labels):
+    """Return the sorted URLs the Traefik labels of a service route to it."""
+    urls = set()
+    for options in router_labels(labels).values():
+        rule = options.get("rule")
+        if not rule:
+            continue
+        for scheme, port in router_schemes(options):
+            netloc_suffix = f":{port}" if port else ""
+            for host, path in parse_rule(rule):
+                urls.add(f"{scheme}://{host}{netloc_suffix}{path or ''}")
+    return sorted(urls)